@@ -17,4 +17,35 @@ axiosPrivate.interceptors.request.use(
     return config;
   },
   (error) => Promise.reject(error)
-);
\ No newline at end of file
+);
+
+// Renovar el access token con el refresh token cuando expira, sin volver a pedir la contraseña
+let refreshRequest = null;
+
+axiosPrivate.interceptors.response.use(
+  (response) => response,
+  async (error) => {
+    const original = error.config;
+    const auth = JSON.parse(localStorage.getItem('auth'));
+    if (error.response?.status !== 401 || original?._retry || !auth?.refresh_token) {
+      return Promise.reject(error);
+    }
+    original._retry = true;
+    try {
+      if (!refreshRequest) {
+        refreshRequest = axios
+          .post(`${BASE_URL}/token/refresh`, { refresh_token: auth.refresh_token })
+          .finally(() => {
+            refreshRequest = null;
+          });
+      }
+      const { data } = await refreshRequest;
+      localStorage.setItem('auth', JSON.stringify({ ...auth, ...data }));
+      original.headers.Authorization = `Bearer ${data.access_token}`;
+      return axiosPrivate(original);
+    } catch (refreshError) {
+      localStorage.removeItem('auth');
+      return Promise.reject(refreshError);
+    }
+  }
+);
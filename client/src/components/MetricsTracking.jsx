@@ -3,6 +3,9 @@ import { useState } from 'react';
 import { axiosPrivate } from '../api/axios';
 import { LineChart, XAxis, YAxis, Tooltip, Line, ResponsiveContainer } from 'recharts';
 
+// Puntos suficientes para el ancho del gráfico; el servidor reduce la serie con LTTB
+const MAX_CHART_POINTS = 300;
+
 export function MetricsTracking({ userId }) {
   const [timeRange, setTimeRange] = useState('month');
   const queryClient = useQueryClient();
@@ -11,7 +14,7 @@ export function MetricsTracking({ userId }) {
     queryKey: ['user-metrics', userId, timeRange],
     queryFn: async () => {
       const response = await axiosPrivate.get(`/metrics/user/${userId}/metrics`, {
-        params: { range: timeRange }
+        params: { range: timeRange, max_points: MAX_CHART_POINTS }
       });
       return response.data;
     }
@@ -9,8 +9,8 @@ from alembic import context
 import sys
 import os
 sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
-from models import *
-from database import DATABASE_URL  # Importa tu URL de base de datos
+from config.database import Base, DATABASE_URL  # Importa tu URL de base de datos
+import models.models  # Registra todas las tablas en Base.metadata
 
 # this is the Alembic Config object, which provides
 # access to the values within the .ini file in use.
@@ -42,7 +42,7 @@ def run_migrations_offline() -> None:
     script output.
 
     """
-    url = SQLALCHEMY_DATABASE_URL  # Usa tu URL de base de datos
+    url = DATABASE_URL  # Usa tu URL de base de datos
     context.configure(
         url=url,
         target_metadata=target_metadata,
@@ -62,7 +62,7 @@ def run_migrations_online() -> None:
 
     """
     configuration = config.get_section(config.config_ini_section)
-    configuration["sqlalchemy.url"] = SQLALCHEMY_DATABASE_URL  # Usa tu URL de base de datos
+    configuration["sqlalchemy.url"] = DATABASE_URL  # Usa tu URL de base de datos
     connectable = engine_from_config(
         configuration,
         prefix="sqlalchemy.",
@@ -0,0 +1,218 @@
+"""baseline
+
+Esquema inicial: las tablas tal y como las creaba create_all() antes de
+introducir las migraciones (sin accounts ni refresh_tokens).
+Las bases de datos existentes creadas con create_all() deben marcarse con
+`alembic stamp 0000_baseline` antes de ejecutar `alembic upgrade head`.
+
+Revision ID: 0000_baseline
+Revises: 
+Create Date: 2026-10-18 08:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0000_baseline'
+down_revision: Union[str, None] = None
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table('admins',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('email', sa.String(length=255), nullable=True),
+    sa.Column('hashed_password', sa.String(length=255), nullable=True),
+    sa.Column('full_name', sa.String(length=255), nullable=True),
+    sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.func.now(), nullable=True),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index(op.f('ix_admins_email'), 'admins', ['email'], unique=True)
+    op.create_index(op.f('ix_admins_id'), 'admins', ['id'], unique=False)
+    op.create_table('trainers',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('email', sa.String(length=255), nullable=True),
+    sa.Column('hashed_password', sa.String(length=255), nullable=True),
+    sa.Column('full_name', sa.String(length=255), nullable=True),
+    sa.Column('specialization', sa.String(length=255), nullable=True),
+    sa.Column('experience_years', sa.Integer(), nullable=True),
+    sa.Column('certification', sa.Text(), nullable=True),
+    sa.Column('biography', sa.Text(), nullable=True),
+    sa.Column('admin_id', sa.Integer(), nullable=True),
+    sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.func.now(), nullable=True),
+    sa.ForeignKeyConstraint(['admin_id'], ['admins.id'], ),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index(op.f('ix_trainers_email'), 'trainers', ['email'], unique=True)
+    op.create_index(op.f('ix_trainers_id'), 'trainers', ['id'], unique=False)
+    op.create_table('nutrition_plans',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('name', sa.String(length=255), nullable=False),
+    sa.Column('description', sa.Text(), nullable=True),
+    sa.Column('trainer_id', sa.Integer(), nullable=True),
+    sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.func.now(), nullable=True),
+    sa.ForeignKeyConstraint(['trainer_id'], ['trainers.id'], ),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index(op.f('ix_nutrition_plans_id'), 'nutrition_plans', ['id'], unique=False)
+    op.create_table('routines',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('name', sa.String(length=255), nullable=False),
+    sa.Column('description', sa.Text(), nullable=True),
+    sa.Column('trainer_id', sa.Integer(), nullable=True),
+    sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.func.now(), nullable=True),
+    sa.ForeignKeyConstraint(['trainer_id'], ['trainers.id'], ),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index(op.f('ix_routines_id'), 'routines', ['id'], unique=False)
+    op.create_table('users',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('email', sa.String(length=255), nullable=True),
+    sa.Column('full_name', sa.String(length=255), nullable=True),
+    sa.Column('hashed_password', sa.String(length=255), nullable=True),
+    sa.Column('height', sa.Float(), nullable=True),
+    sa.Column('target_weight', sa.Float(), nullable=True),
+    sa.Column('fitness_goal', sa.String(length=255), nullable=True),
+    sa.Column('health_conditions', sa.String(length=255), nullable=True),
+    sa.Column('emergency_contact', sa.String(length=255), nullable=True),
+    sa.Column('trainer_id', sa.Integer(), nullable=True),
+    sa.Column('created_at', sa.DateTime(), nullable=True),
+    sa.Column('weight_goal', sa.Float(), nullable=True),
+    sa.Column('body_fat_goal', sa.Float(), nullable=True),
+    sa.Column('muscle_mass_goal', sa.Float(), nullable=True),
+    sa.Column('activity_level_goal', sa.Integer(), nullable=True),
+    sa.Column('calories_goal', sa.Integer(), nullable=True),
+    sa.Column('protein_goal', sa.Integer(), nullable=True),
+    sa.Column('carbs_goal', sa.Integer(), nullable=True),
+    sa.Column('fat_goal', sa.Integer(), nullable=True),
+    sa.Column('water_goal', sa.Float(), nullable=True),
+    sa.Column('steps_goal', sa.Integer(), nullable=True),
+    sa.ForeignKeyConstraint(['trainer_id'], ['trainers.id'], ),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index(op.f('ix_users_email'), 'users', ['email'], unique=True)
+    op.create_index(op.f('ix_users_id'), 'users', ['id'], unique=False)
+    op.create_table('workout_plans',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('name', sa.String(length=255), nullable=False),
+    sa.Column('description', sa.Text(), nullable=True),
+    sa.Column('trainer_id', sa.Integer(), nullable=True),
+    sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.func.now(), nullable=True),
+    sa.ForeignKeyConstraint(['trainer_id'], ['trainers.id'], ),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index(op.f('ix_workout_plans_id'), 'workout_plans', ['id'], unique=False)
+    op.create_table('exercises',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('name', sa.String(length=255), nullable=False),
+    sa.Column('sets', sa.Integer(), nullable=False),
+    sa.Column('reps', sa.Integer(), nullable=False),
+    sa.Column('workout_plan_id', sa.Integer(), nullable=True),
+    sa.Column('routine_id', sa.Integer(), nullable=True),
+    sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.func.now(), nullable=True),
+    sa.ForeignKeyConstraint(['routine_id'], ['routines.id'], ),
+    sa.ForeignKeyConstraint(['workout_plan_id'], ['workout_plans.id'], ),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index(op.f('ix_exercises_id'), 'exercises', ['id'], unique=False)
+    op.create_table('meals',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('name', sa.String(length=255), nullable=False),
+    sa.Column('description', sa.Text(), nullable=True),
+    sa.Column('calories', sa.Integer(), nullable=False),
+    sa.Column('nutrition_plan_id', sa.Integer(), nullable=True),
+    sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.func.now(), nullable=True),
+    sa.ForeignKeyConstraint(['nutrition_plan_id'], ['nutrition_plans.id'], ),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index(op.f('ix_meals_id'), 'meals', ['id'], unique=False)
+    op.create_table('nutrition_progress',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('user_id', sa.Integer(), nullable=True),
+    sa.Column('nutrition_plan_id', sa.Integer(), nullable=True),
+    sa.Column('date', sa.DateTime(timezone=True), nullable=False),
+    sa.Column('completed', sa.Boolean(), nullable=True),
+    sa.Column('notes', sa.Text(), nullable=True),
+    sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.func.now(), nullable=True),
+    sa.ForeignKeyConstraint(['nutrition_plan_id'], ['nutrition_plans.id'], ondelete='CASCADE'),
+    sa.ForeignKeyConstraint(['user_id'], ['users.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index(op.f('ix_nutrition_progress_id'), 'nutrition_progress', ['id'], unique=False)
+    op.create_table('user_metrics',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('user_id', sa.Integer(), nullable=True),
+    sa.Column('date', sa.DateTime(timezone=True), nullable=False),
+    sa.Column('weight', sa.Float(), nullable=True),
+    sa.Column('body_fat', sa.Float(), nullable=True),
+    sa.Column('muscle_mass', sa.Float(), nullable=True),
+    sa.Column('height', sa.Float(), nullable=True),
+    sa.Column('bmi', sa.Float(), nullable=True),
+    sa.Column('notes', sa.Text(), nullable=True),
+    sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.func.now(), nullable=True),
+    sa.ForeignKeyConstraint(['user_id'], ['users.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index(op.f('ix_user_metrics_id'), 'user_metrics', ['id'], unique=False)
+    op.create_table('user_nutrition_plans',
+    sa.Column('user_id', sa.Integer(), nullable=False),
+    sa.Column('nutrition_plan_id', sa.Integer(), nullable=False),
+    sa.ForeignKeyConstraint(['nutrition_plan_id'], ['nutrition_plans.id'], ondelete='CASCADE'),
+    sa.ForeignKeyConstraint(['user_id'], ['users.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('user_id', 'nutrition_plan_id')
+    )
+    op.create_table('user_workout_plans',
+    sa.Column('user_id', sa.Integer(), nullable=False),
+    sa.Column('workout_plan_id', sa.Integer(), nullable=False),
+    sa.ForeignKeyConstraint(['user_id'], ['users.id'], ondelete='CASCADE'),
+    sa.ForeignKeyConstraint(['workout_plan_id'], ['workout_plans.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('user_id', 'workout_plan_id')
+    )
+    op.create_table('workout_progress',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('user_id', sa.Integer(), nullable=True),
+    sa.Column('workout_plan_id', sa.Integer(), nullable=True),
+    sa.Column('date', sa.DateTime(timezone=True), nullable=False),
+    sa.Column('completed', sa.Boolean(), nullable=True),
+    sa.Column('notes', sa.Text(), nullable=True),
+    sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.func.now(), nullable=True),
+    sa.ForeignKeyConstraint(['user_id'], ['users.id'], ondelete='CASCADE'),
+    sa.ForeignKeyConstraint(['workout_plan_id'], ['workout_plans.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index(op.f('ix_workout_progress_id'), 'workout_progress', ['id'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index(op.f('ix_workout_progress_id'), table_name='workout_progress')
+    op.drop_table('workout_progress')
+    op.drop_table('user_workout_plans')
+    op.drop_table('user_nutrition_plans')
+    op.drop_index(op.f('ix_user_metrics_id'), table_name='user_metrics')
+    op.drop_table('user_metrics')
+    op.drop_index(op.f('ix_nutrition_progress_id'), table_name='nutrition_progress')
+    op.drop_table('nutrition_progress')
+    op.drop_index(op.f('ix_meals_id'), table_name='meals')
+    op.drop_table('meals')
+    op.drop_index(op.f('ix_exercises_id'), table_name='exercises')
+    op.drop_table('exercises')
+    op.drop_index(op.f('ix_workout_plans_id'), table_name='workout_plans')
+    op.drop_table('workout_plans')
+    op.drop_index(op.f('ix_users_id'), table_name='users')
+    op.drop_index(op.f('ix_users_email'), table_name='users')
+    op.drop_table('users')
+    op.drop_index(op.f('ix_routines_id'), table_name='routines')
+    op.drop_table('routines')
+    op.drop_index(op.f('ix_nutrition_plans_id'), table_name='nutrition_plans')
+    op.drop_table('nutrition_plans')
+    op.drop_index(op.f('ix_trainers_id'), table_name='trainers')
+    op.drop_index(op.f('ix_trainers_email'), table_name='trainers')
+    op.drop_table('trainers')
+    op.drop_index(op.f('ix_admins_id'), table_name='admins')
+    op.drop_index(op.f('ix_admins_email'), table_name='admins')
+    op.drop_table('admins')
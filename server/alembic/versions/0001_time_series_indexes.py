@@ -0,0 +1,42 @@
+"""time series indexes
+
+Índices compuestos (user_id, date) y (user_id, plan_id, date) para las
+consultas por rango de fechas, e índices inversos en las tablas de asignación.
+
+Revision ID: 0001_time_series_indexes
+Revises: 0000_baseline
+Create Date: 2026-10-18 09:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0001_time_series_indexes'
+down_revision: Union[str, None] = '0000_baseline'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+INDEXES = [
+    ('ix_user_metrics_user_date', 'user_metrics', ['user_id', 'date']),
+    ('ix_workout_progress_user_date', 'workout_progress', ['user_id', 'date']),
+    ('ix_workout_progress_user_plan_date', 'workout_progress', ['user_id', 'workout_plan_id', 'date']),
+    ('ix_nutrition_progress_user_date', 'nutrition_progress', ['user_id', 'date']),
+    ('ix_nutrition_progress_user_plan_date', 'nutrition_progress', ['user_id', 'nutrition_plan_id', 'date']),
+    ('ix_user_workout_plans_plan_user', 'user_workout_plans', ['workout_plan_id', 'user_id']),
+    ('ix_user_nutrition_plans_plan_user', 'user_nutrition_plans', ['nutrition_plan_id', 'user_id']),
+]
+
+
+def upgrade() -> None:
+    for name, table, columns in INDEXES:
+        op.create_index(name, table, columns)
+
+
+def downgrade() -> None:
+    for name, table, columns in reversed(INDEXES):
+        op.drop_index(name, table_name=table)
@@ -0,0 +1,64 @@
+"""auth tables
+
+Índice de identidades (accounts) y almacén de refresh tokens. Va antes del
+relleno de accounts; las bases que ya tienen las tablas (migradas con una
+revisión base anterior que las incluía) se dejan como están.
+
+Revision ID: 0001a_auth_tables
+Revises: 0001_time_series_indexes
+Create Date: 2026-10-18 09:30:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0001a_auth_tables'
+down_revision: Union[str, None] = '0001_time_series_indexes'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    inspector = sa.inspect(op.get_bind())
+    if not inspector.has_table('accounts'):
+        op.create_table('accounts',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('email', sa.String(length=255), nullable=False),
+        sa.Column('role', sa.String(length=16), nullable=False),
+        sa.Column('account_id', sa.Integer(), nullable=False),
+        sa.Column('hashed_password', sa.String(length=255), nullable=True),
+        sa.PrimaryKeyConstraint('id'),
+        sa.UniqueConstraint('role', 'account_id', name='uq_accounts_role_account_id')
+        )
+        op.create_index(op.f('ix_accounts_email'), 'accounts', ['email'], unique=False)
+        op.create_index(op.f('ix_accounts_id'), 'accounts', ['id'], unique=False)
+    if not inspector.has_table('refresh_tokens'):
+        op.create_table('refresh_tokens',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('jti', sa.String(length=64), nullable=False),
+        sa.Column('family_id', sa.String(length=64), nullable=False),
+        sa.Column('email', sa.String(length=255), nullable=False),
+        sa.Column('role', sa.String(length=16), nullable=False),
+        sa.Column('expires_at', sa.DateTime(), nullable=False),
+        sa.Column('revoked_at', sa.DateTime(), nullable=True),
+        sa.Column('replaced_by', sa.String(length=64), nullable=True),
+        sa.Column('created_at', sa.DateTime(), nullable=True),
+        sa.PrimaryKeyConstraint('id')
+        )
+        op.create_index(op.f('ix_refresh_tokens_family_id'), 'refresh_tokens', ['family_id'], unique=False)
+        op.create_index(op.f('ix_refresh_tokens_id'), 'refresh_tokens', ['id'], unique=False)
+        op.create_index(op.f('ix_refresh_tokens_jti'), 'refresh_tokens', ['jti'], unique=True)
+
+
+def downgrade() -> None:
+    op.drop_index(op.f('ix_refresh_tokens_jti'), table_name='refresh_tokens')
+    op.drop_index(op.f('ix_refresh_tokens_id'), table_name='refresh_tokens')
+    op.drop_index(op.f('ix_refresh_tokens_family_id'), table_name='refresh_tokens')
+    op.drop_table('refresh_tokens')
+    op.drop_index(op.f('ix_accounts_id'), table_name='accounts')
+    op.drop_index(op.f('ix_accounts_email'), table_name='accounts')
+    op.drop_table('accounts')
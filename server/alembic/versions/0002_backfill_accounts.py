@@ -0,0 +1,40 @@
+"""backfill accounts
+
+Rellena el índice de identidades con las cuentas que ya existían en
+admins, trainers y users. Es idempotente: solo inserta las que faltan.
+
+Revision ID: 0002_backfill_accounts
+Revises: 0001a_auth_tables
+Create Date: 2026-10-18 10:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0002_backfill_accounts'
+down_revision: Union[str, None] = '0001a_auth_tables'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+ROLE_TABLES = [('admin', 'admins'), ('trainer', 'trainers'), ('user', 'users')]
+
+
+def upgrade() -> None:
+    for role, table in ROLE_TABLES:
+        op.execute(sa.text(f"""
+            INSERT INTO accounts (email, role, account_id, hashed_password)
+            SELECT t.email, :role, t.id, t.hashed_password
+            FROM {table} t
+            WHERE t.email IS NOT NULL AND NOT EXISTS (
+                SELECT 1 FROM accounts a WHERE a.role = :role AND a.account_id = t.id
+            )
+        """).bindparams(role=role))
+
+
+def downgrade() -> None:
+    pass
@@ -0,0 +1,52 @@
+"""dashboard counters
+
+Tabla de una sola fila con los totales del panel de administración,
+inicializada con los recuentos actuales, e índices en created_at para
+las altas de los últimos 30 días.
+
+Revision ID: 0003_dashboard_counters
+Revises: 0002_backfill_accounts
+Create Date: 2026-10-18 12:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0003_dashboard_counters'
+down_revision: Union[str, None] = '0002_backfill_accounts'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        'dashboard_counters',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('users', sa.Integer(), nullable=False),
+        sa.Column('trainers', sa.Integer(), nullable=False),
+        sa.Column('workout_plans', sa.Integer(), nullable=False),
+        sa.Column('nutrition_plans', sa.Integer(), nullable=False),
+        sa.Column('reconciled_at', sa.DateTime(timezone=True), nullable=True),
+        sa.PrimaryKeyConstraint('id')
+    )
+    op.execute(sa.text("""
+        INSERT INTO dashboard_counters (id, users, trainers, workout_plans, nutrition_plans, reconciled_at)
+        SELECT 1,
+            (SELECT COUNT(*) FROM users),
+            (SELECT COUNT(*) FROM trainers),
+            (SELECT COUNT(*) FROM workout_plans),
+            (SELECT COUNT(*) FROM nutrition_plans),
+            CURRENT_TIMESTAMP
+    """))
+    op.create_index(op.f('ix_users_created_at'), 'users', ['created_at'])
+    op.create_index(op.f('ix_trainers_created_at'), 'trainers', ['created_at'])
+
+
+def downgrade() -> None:
+    op.drop_index(op.f('ix_trainers_created_at'), table_name='trainers')
+    op.drop_index(op.f('ix_users_created_at'), table_name='users')
+    op.drop_table('dashboard_counters')
@@ -0,0 +1,52 @@
+"""daily rollups
+
+Resúmenes diarios (total, completados) por usuario de workout_progress y
+nutrition_progress, rellenados a partir de los registros existentes.
+
+Revision ID: 0004_daily_rollups
+Revises: 0003_dashboard_counters
+Create Date: 2026-10-18 13:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0004_daily_rollups'
+down_revision: Union[str, None] = '0003_dashboard_counters'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+ROLLUPS = [
+    ('workout_daily_rollups', 'workout_progress'),
+    ('nutrition_daily_rollups', 'nutrition_progress'),
+]
+
+
+def upgrade() -> None:
+    for rollup, source in ROLLUPS:
+        op.create_table(
+            rollup,
+            sa.Column('user_id', sa.Integer(), nullable=False),
+            sa.Column('day', sa.Date(), nullable=False),
+            sa.Column('total', sa.Integer(), nullable=False),
+            sa.Column('completed', sa.Integer(), nullable=False),
+            sa.ForeignKeyConstraint(['user_id'], ['users.id'], ondelete='CASCADE'),
+            sa.PrimaryKeyConstraint('user_id', 'day')
+        )
+        op.execute(sa.text(f"""
+            INSERT INTO {rollup} (user_id, day, total, completed)
+            SELECT user_id, DATE(date), COUNT(id), COALESCE(SUM(CASE WHEN completed THEN 1 ELSE 0 END), 0)
+            FROM {source}
+            WHERE user_id IS NOT NULL
+            GROUP BY user_id, DATE(date)
+        """))
+
+
+def downgrade() -> None:
+    for rollup, source in reversed(ROLLUPS):
+        op.drop_table(rollup)
@@ -0,0 +1,64 @@
+"""progress summaries
+
+Fila por usuario con su primera y última medición (peso, grasa corporal,
+masa muscular) y el número de registros, rellenada desde user_metrics.
+
+Revision ID: 0005_progress_summaries
+Revises: 0004_daily_rollups
+Create Date: 2026-10-18 14:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0005_progress_summaries'
+down_revision: Union[str, None] = '0004_daily_rollups'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+FIELDS = ['weight', 'body_fat', 'muscle_mass']
+
+
+def upgrade() -> None:
+    op.create_table(
+        'user_progress_summaries',
+        sa.Column('user_id', sa.Integer(), nullable=False),
+        sa.Column('metrics_count', sa.Integer(), nullable=False),
+        sa.Column('first_date', sa.DateTime(timezone=True), nullable=False),
+        *(sa.Column(f'first_{field}', sa.Float(), nullable=True) for field in FIELDS),
+        sa.Column('latest_date', sa.DateTime(timezone=True), nullable=False),
+        *(sa.Column(f'latest_{field}', sa.Float(), nullable=True) for field in FIELDS),
+        sa.ForeignKeyConstraint(['user_id'], ['users.id'], ondelete='CASCADE'),
+        sa.PrimaryKeyConstraint('user_id')
+    )
+    op.execute(sa.text("""
+        INSERT INTO user_progress_summaries (user_id, metrics_count, first_date, latest_date)
+        SELECT user_id, COUNT(id), MIN(date), MAX(date)
+        FROM user_metrics
+        WHERE user_id IS NOT NULL
+        GROUP BY user_id
+    """))
+    # En empates de fecha: la primera es la de menor id y la última la de mayor id
+    for field in FIELDS:
+        op.execute(sa.text(f"""
+            UPDATE user_progress_summaries SET
+                first_{field} = (
+                    SELECT m.{field} FROM user_metrics m
+                    WHERE m.user_id = user_progress_summaries.user_id AND m.date = user_progress_summaries.first_date
+                    ORDER BY m.id LIMIT 1
+                ),
+                latest_{field} = (
+                    SELECT m.{field} FROM user_metrics m
+                    WHERE m.user_id = user_progress_summaries.user_id AND m.date = user_progress_summaries.latest_date
+                    ORDER BY m.id DESC LIMIT 1
+                )
+        """))
+
+
+def downgrade() -> None:
+    op.drop_table('user_progress_summaries')
@@ -0,0 +1,87 @@
+"""Benchmark the NumPy metrics analytics on multi-year daily series.
+
+Usage (from the server directory):
+
+    python benchmarks/bench_analytics.py --years 1 5 10
+
+For each length, times analyze_series on an in-memory series (the
+vectorized part alone) and the full path used by the endpoint: one
+column query against a seeded SQLite database, conversion to arrays and
+the analysis. Also times downsample (LTTB) of the series to --max-points.
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+os.environ.setdefault("DATABASE_URL", "sqlite://")
+
+from sqlalchemy import create_engine  # noqa: E402
+from config.database import Base  # noqa: E402
+import models.models as models  # noqa: E402
+from utils.analytics import analyze_series, downsample, metric_series_query, to_arrays  # noqa: E402
+
+
+def synthetic_rows(days: int, seed: int = 42):
+    rng = np.random.default_rng(seed)
+    start = datetime(2015, 1, 1)
+    weight = 90 - np.linspace(0, 12, days) + rng.normal(0, 0.6, days)
+    body_fat = 28 - np.linspace(0, 6, days) + rng.normal(0, 0.4, days)
+    muscle = 35 + np.linspace(0, 3, days) + rng.normal(0, 0.3, days)
+    # Algunos días sin grasa corporal ni masa muscular, como en los registros reales
+    gaps = rng.random(days) < 0.3
+    return [
+        (start + timedelta(days=day), float(weight[day]),
+         None if gaps[day] else float(body_fat[day]), None if gaps[day] else float(muscle[day]))
+        for day in range(days)
+    ]
+
+
+def best_of(repeat: int, fn) -> float:
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn()
+        timings.append(time.perf_counter() - started)
+    return min(timings) * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--years", type=int, nargs="+", default=[1, 5, 10])
+    parser.add_argument("--repeat", type=int, default=20)
+    parser.add_argument("--max-points", type=int, default=300)
+    args = parser.parse_args()
+
+    print(f"{'years':>6}{'points':>9}{'analyze (ms)':>15}{'query+analyze (ms)':>21}{'lttb (ms)':>12}")
+    with tempfile.TemporaryDirectory() as tmp:
+        engine = create_engine(f"sqlite:///{os.path.join(tmp, 'bench.db')}")
+        Base.metadata.create_all(engine)
+        for user_id, years in enumerate(args.years, start=1):
+            rows = synthetic_rows(years * 365)
+            with engine.begin() as conn:
+                conn.execute(models.User.__table__.insert(), [{"id": user_id, "email": f"user{user_id}@bench.local"}])
+                conn.execute(models.UserMetrics.__table__.insert(), [
+                    {"user_id": user_id, "date": row[0], "weight": row[1], "body_fat": row[2], "muscle_mass": row[3]}
+                    for row in rows
+                ])
+
+            series = to_arrays(rows)
+            analyze_ms = best_of(args.repeat, lambda: analyze_series(series))
+
+            def full_path():
+                with engine.connect() as conn:
+                    analyze_series(to_arrays(conn.execute(metric_series_query(user_id)).all()))
+
+            full_ms = best_of(args.repeat, full_path)
+            lttb_ms = best_of(args.repeat, lambda: downsample(series, args.max_points))
+            print(f"{years:>6}{len(rows):>9,}{analyze_ms:>15.2f}{full_ms:>21.2f}{lttb_ms:>12.2f}")
+
+
+if __name__ == "__main__":
+    main()
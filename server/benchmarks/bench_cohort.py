@@ -0,0 +1,116 @@
+"""Benchmark the trainer cohort against one user-stats computation per client.
+
+Usage (from the server directory):
+
+    python benchmarks/bench_cohort.py --clients 50 200 500
+
+For each roster size, seeds a SQLite database with a year of workout and
+nutrition progress and weekly weigh-ins per client, then times the per-user
+path (completion rates from the rollups plus a metrics query, as
+/trainer/user-stats does for each client) against compute_cohort, counting
+the statements each one runs.
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+os.environ.setdefault("DATABASE_URL", "sqlite://")
+
+from sqlalchemy import create_engine, event  # noqa: E402
+from sqlalchemy.orm import Session  # noqa: E402
+from config.database import Base  # noqa: E402
+import models.models as models  # noqa: E402
+from utils.cohort import compute_cohort  # noqa: E402
+from utils.metrics import calculate_progress_stats, get_user_completion_rates  # noqa: E402
+from utils.progress_summary import rebuild_progress_summaries  # noqa: E402
+from utils.rollups import rebuild_daily_rollups  # noqa: E402
+
+DAYS = 365
+
+
+def seed(engine, trainer_id: int, clients: int, first_user_id: int):
+    start = datetime.utcnow() - timedelta(days=DAYS)
+    users = range(first_user_id, first_user_id + clients)
+    with engine.begin() as conn:
+        conn.execute(models.User.__table__.insert(), [
+            {"id": user_id, "email": f"user{user_id}@bench.local", "trainer_id": trainer_id} for user_id in users
+        ])
+        for model in (models.WorkoutProgress, models.NutritionProgress):
+            conn.execute(model.__table__.insert(), [
+                {"user_id": user_id, "date": start + timedelta(days=day), "completed": (user_id + day) % 3 != 0}
+                for user_id in users for day in range(DAYS)
+            ])
+        conn.execute(models.UserMetrics.__table__.insert(), [
+            {"user_id": user_id, "date": start + timedelta(days=day), "weight": 90 - day / 60}
+            for user_id in users for day in range(0, DAYS, 7)
+        ])
+    return list(users)
+
+
+def per_user(db: Session, user_ids, start_date, end_date):
+    for user_id in user_ids:
+        get_user_completion_rates(db, user_id, start_date, end_date)
+        metrics = db.query(models.UserMetrics).filter(
+            models.UserMetrics.user_id == user_id,
+            models.UserMetrics.date.between(start_date, end_date)
+        ).order_by(models.UserMetrics.date).all()
+        calculate_progress_stats(metrics)
+
+
+def measure(engine, repeat: int, fn):
+    statements = []
+
+    def count(*args):
+        statements.append(1)
+
+    event.listen(engine, "before_cursor_execute", count)
+    timings = []
+    try:
+        for _ in range(repeat):
+            statements.clear()
+            with Session(engine) as db:
+                started = time.perf_counter()
+                fn(db)
+                timings.append(time.perf_counter() - started)
+    finally:
+        event.remove(engine, "before_cursor_execute", count)
+    return min(timings) * 1000, len(statements)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--clients", type=int, nargs="+", default=[50, 200])
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    end_date = datetime.utcnow()
+    start_date = end_date - timedelta(days=30)
+    print(f"{'clients':>8}{'per-user (ms)':>15}{'queries':>9}{'cohort (ms)':>13}{'queries':>9}")
+    with tempfile.TemporaryDirectory() as tmp:
+        engine = create_engine(f"sqlite:///{os.path.join(tmp, 'bench.db')}")
+        Base.metadata.create_all(engine)
+        next_user_id = 1
+        for trainer_id, clients in enumerate(args.clients, start=1):
+            with engine.begin() as conn:
+                conn.execute(models.Trainer.__table__.insert(), [{"id": trainer_id, "email": f"t{trainer_id}@bench.local"}])
+            user_ids = seed(engine, trainer_id, clients, next_user_id)
+            next_user_id += clients
+            with Session(engine) as db:
+                rebuild_daily_rollups(db)
+                rebuild_progress_summaries(db)
+
+            per_user_ms, per_user_queries = measure(
+                engine, args.repeat, lambda db: per_user(db, user_ids, start_date, end_date)
+            )
+            cohort_ms, cohort_queries = measure(
+                engine, args.repeat, lambda db: compute_cohort(db, trainer_id, start_date, end_date)
+            )
+            print(f"{clients:>8}{per_user_ms:>15.1f}{per_user_queries:>9}{cohort_ms:>13.1f}{cohort_queries:>9}")
+
+
+if __name__ == "__main__":
+    main()
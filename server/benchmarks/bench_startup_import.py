@@ -0,0 +1,107 @@
+"""Measure the cold import time of `main` and fail if it regresses.
+
+Usage (from the server directory):
+
+    python benchmarks/bench_startup_import.py            # compare against the baseline
+    python benchmarks/bench_startup_import.py --update   # record a new baseline
+
+Each run imports `main` in a fresh interpreter with `-X importtime`, so
+the figure is the cost a new worker pays before it can serve requests.
+The median over several runs is compared with startup_baseline.json,
+and the script exits non-zero if it exceeds the baseline by more than
+the allowed tolerance or if any module that should only load on demand
+(matplotlib, fpdf, alembic) was imported at startup.
+"""
+import argparse
+import json
+import os
+import re
+import statistics
+import subprocess
+import sys
+
+SERVER_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+BASELINE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "startup_baseline.json")
+
+# Módulos pesados que solo deben cargarse cuando se usan
+LAZY_MODULES = ["matplotlib", "fpdf", "alembic"]
+
+IMPORTTIME_LINE = re.compile(r"import time:\s+(\d+) \|\s+(\d+) \|(\s+)(\S+)")
+
+
+def import_main() -> dict:
+    env = dict(os.environ)
+    env.setdefault("SECRET_KEY", "bench")
+    env.setdefault("DATABASE_URL", "sqlite://")
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", "import main"],
+        cwd=SERVER_DIR, env=env, capture_output=True, text=True
+    )
+    if result.returncode != 0:
+        raise SystemExit(f"Importing main failed:\n{result.stderr[-2000:]}")
+
+    modules = {}
+    total_us = 0
+    for line in result.stderr.splitlines():
+        match = IMPORTTIME_LINE.match(line)
+        if not match:
+            continue
+        self_us, cumulative_us, indent, name = match.groups()
+        modules[name] = int(self_us)
+        if name == "main":
+            total_us = int(cumulative_us)
+    return {"total_ms": total_us / 1000, "modules": modules}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=7)
+    parser.add_argument("--tolerance", type=float, default=None,
+                        help="allowed slowdown over the baseline, as a fraction (default: from the baseline file)")
+    parser.add_argument("--top", type=int, default=10, help="slowest modules to print")
+    parser.add_argument("--update", action="store_true", help="write the measured median as the new baseline")
+    args = parser.parse_args()
+
+    runs = [import_main() for _ in range(args.runs)]
+    median_ms = statistics.median(run["total_ms"] for run in runs)
+    print(f"import main: median {median_ms:.0f} ms over {args.runs} runs "
+          f"(min {min(run['total_ms'] for run in runs):.0f} ms)")
+
+    slowest = sorted(runs[-1]["modules"].items(), key=lambda item: item[1], reverse=True)[:args.top]
+    print(f"\n{'module':<50}{'self (ms)':>10}")
+    for name, self_us in slowest:
+        print(f"{name:<50}{self_us / 1000:>10.1f}")
+
+    failures = []
+    loaded = sorted({
+        name for run in runs for name in run["modules"]
+        if name.split(".")[0] in LAZY_MODULES
+    })
+    if loaded:
+        roots = sorted({name.split(".")[0] for name in loaded})
+        failures.append(f"modules that should load lazily were imported at startup: {', '.join(roots)}")
+
+    if args.update:
+        tolerance = args.tolerance if args.tolerance is not None else 0.5
+        with open(BASELINE_PATH, "w") as f:
+            json.dump({"import_main_ms": round(median_ms), "tolerance": tolerance}, f, indent=2)
+            f.write("\n")
+        print(f"\nBaseline updated: {round(median_ms)} ms")
+    elif os.path.exists(BASELINE_PATH):
+        with open(BASELINE_PATH) as f:
+            baseline = json.load(f)
+        tolerance = args.tolerance if args.tolerance is not None else baseline.get("tolerance", 0.5)
+        limit = baseline["import_main_ms"] * (1 + tolerance)
+        print(f"\nBaseline {baseline['import_main_ms']} ms, limit {limit:.0f} ms (+{tolerance:.0%})")
+        if median_ms > limit:
+            failures.append(f"import time regressed: {median_ms:.0f} ms > {limit:.0f} ms")
+    else:
+        print("\nNo baseline recorded yet; run with --update to create one")
+
+    for failure in failures:
+        print(f"FAIL: {failure}", file=sys.stderr)
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,143 @@
+"""Benchmark the (user_id, date) composite indexes on a seeded SQLite database.
+
+Usage (from the server directory):
+
+    python benchmarks/bench_time_series_indexes.py --rows 2000000
+
+Seeds workout_progress, nutrition_progress and user_metrics with synthetic
+daily rows, then times the range queries used by the analytics endpoints
+with the composite indexes dropped and again with them created.
+"""
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+os.environ.setdefault("DATABASE_URL", "sqlite://")
+
+from sqlalchemy import Integer, create_engine, func, select, text  # noqa: E402
+from config.database import Base  # noqa: E402
+import models.models as models  # noqa: E402
+
+TIME_SERIES_TABLES = [models.UserMetrics, models.WorkoutProgress, models.NutritionProgress]
+
+
+def seed(engine, rows: int, users: int, plans: int):
+    start = datetime(2020, 1, 1)
+    days = max(rows // users, 1)
+    rng = random.Random(42)
+    with engine.begin() as conn:
+        conn.execute(models.User.__table__.insert(), [
+            {"id": user_id, "email": f"user{user_id}@bench.local", "full_name": f"User {user_id}"}
+            for user_id in range(1, users + 1)
+        ])
+        for model, plan_column in (
+            (models.WorkoutProgress, "workout_plan_id"),
+            (models.NutritionProgress, "nutrition_plan_id"),
+            (models.UserMetrics, None),
+        ):
+            batch = []
+            # Orden por día y luego por usuario, como llegan los registros en producción
+            for day in range(days):
+                date = start + timedelta(days=day)
+                for user_id in range(1, users + 1):
+                    row = {"user_id": user_id, "date": date}
+                    if plan_column:
+                        row[plan_column] = rng.randint(1, plans)
+                        row["completed"] = rng.random() < 0.7
+                    else:
+                        row["weight"] = 80 + rng.uniform(-5, 5)
+                    batch.append(row)
+                    if len(batch) >= 50000:
+                        conn.execute(model.__table__.insert(), batch)
+                        batch = []
+            if batch:
+                conn.execute(model.__table__.insert(), batch)
+    return start, start + timedelta(days=days)
+
+
+def composite_indexes():
+    return [
+        index
+        for model in TIME_SERIES_TABLES
+        for index in model.__table__.indexes
+        if len(index.columns) > 1
+    ]
+
+
+def queries(user_id: int, plan_id: int, start: datetime, end: datetime):
+    wp = models.WorkoutProgress
+    return {
+        "completion rates (count/sum over range)": select(
+            func.count(wp.id), func.sum(wp.completed.cast(Integer))
+        ).where(wp.user_id == user_id, wp.date.between(start, end)),
+        "trainer progress (range ordered by date)": select(wp).where(
+            wp.user_id == user_id, wp.date.between(start, end)
+        ).order_by(wp.date),
+        "plan progress (user + plan ordered by date)": select(wp).where(
+            wp.workout_plan_id == plan_id, wp.user_id == user_id
+        ).order_by(wp.date.desc()),
+        "metrics range": select(models.UserMetrics).where(
+            models.UserMetrics.user_id == user_id,
+            models.UserMetrics.date.between(start, end)
+        ).order_by(models.UserMetrics.date),
+    }
+
+
+def time_queries(engine, stmts: dict, repeat: int) -> dict:
+    timings = {}
+    with engine.connect() as conn:
+        for name, stmt in stmts.items():
+            conn.execute(stmt).fetchall()
+            started = time.perf_counter()
+            for _ in range(repeat):
+                conn.execute(stmt).fetchall()
+            timings[name] = (time.perf_counter() - started) / repeat * 1000
+    return timings
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=1_000_000, help="rows per time-series table")
+    parser.add_argument("--users", type=int, default=1000)
+    parser.add_argument("--plans", type=int, default=20)
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        engine = create_engine(f"sqlite:///{os.path.join(tmp, 'bench.db')}")
+        Base.metadata.create_all(engine)
+        indexes = composite_indexes()
+        for index in indexes:
+            index.drop(engine)
+
+        started = time.perf_counter()
+        first_day, last_day = seed(engine, args.rows, args.users, args.plans)
+        print(f"Seeded {args.rows:,} rows per table in {time.perf_counter() - started:.1f}s")
+
+        user_id = args.users // 2
+        window_end = last_day
+        window_start = last_day - timedelta(days=30)
+        stmts = queries(user_id, 1, window_start, window_end)
+
+        before = time_queries(engine, stmts, args.repeat)
+        started = time.perf_counter()
+        for index in indexes:
+            index.create(engine)
+        with engine.connect() as conn:
+            conn.execute(text("ANALYZE"))
+        print(f"Created {len(indexes)} composite indexes in {time.perf_counter() - started:.1f}s")
+        after = time_queries(engine, stmts, args.repeat)
+
+        print(f"\n{'query':<45}{'no index (ms)':>15}{'indexed (ms)':>15}{'speedup':>10}")
+        for name in stmts:
+            speedup = before[name] / after[name] if after[name] else float("inf")
+            print(f"{name:<45}{before[name]:>15.2f}{after[name]:>15.2f}{speedup:>9.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,20 +1,305 @@
-from sqlalchemy import create_engine
+import asyncio
+import contextlib
+import itertools
+import threading
+import time
+from sqlalchemy import create_engine, event, exc
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
 from sqlalchemy.ext.declarative import declarative_base
-from sqlalchemy.orm import sessionmaker
+from sqlalchemy.orm import Session, sessionmaker
+from sqlalchemy.pool import AsyncAdaptedQueuePool, QueuePool
+from fastapi import Depends, Request
 from dotenv import load_dotenv
 import os
 
+from utils.cache import TTLCache
+from utils.slow_query_log import SlowQueryLog
+
 load_dotenv()
 
-DATABASE_URL = f"mysql+pymysql://{os.getenv('DB_USER')}:{os.getenv('DB_PASSWORD')}@{os.getenv('DB_HOST')}/{os.getenv('DB_NAME')}"
+DATABASE_URL = os.getenv("DATABASE_URL") or f"mysql+pymysql://{os.getenv('DB_USER')}:{os.getenv('DB_PASSWORD')}@{os.getenv('DB_HOST')}/{os.getenv('DB_NAME')}"
+
+# Configuración del pool de conexiones
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "5"))
+DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", "10"))
+DB_POOL_TIMEOUT = float(os.getenv("DB_POOL_TIMEOUT", "30"))
+DB_POOL_RECYCLE = int(os.getenv("DB_POOL_RECYCLE", "1800"))
+DB_POOL_PRE_PING = os.getenv("DB_POOL_PRE_PING", "true").lower() in ("1", "true", "yes")
+
+# Drivers asíncronos equivalentes a los síncronos
+ASYNC_DRIVERS = {
+    "mysql": "mysql+aiomysql",
+    "mysql+pymysql": "mysql+aiomysql",
+    "sqlite": "sqlite+aiosqlite",
+    "sqlite+pysqlite": "sqlite+aiosqlite",
+}
+
+
+def to_async_url(url: str) -> str:
+    """Translate a sync database URL to the matching asyncio driver"""
+    url = make_url(url)
+    return url.set(drivername=ASYNC_DRIVERS.get(url.drivername, url.drivername)).render_as_string(hide_password=False)
+
+
+ASYNC_DATABASE_URL = os.getenv("ASYNC_DATABASE_URL") or to_async_url(DATABASE_URL)
+
+# Réplicas de lectura opcionales, separadas por comas (p. ej. un segundo fichero SQLite en local)
+DATABASE_REPLICA_URLS = [url.strip() for url in os.getenv("DATABASE_REPLICA_URLS", "").split(",") if url.strip()]
+DB_REPLICA_HEALTH_CHECK_INTERVAL = float(os.getenv("DB_REPLICA_HEALTH_CHECK_INTERVAL", "30"))
+DB_REPLICA_HEALTH_CHECK_TIMEOUT = float(os.getenv("DB_REPLICA_HEALTH_CHECK_TIMEOUT", "5"))
+# Tras escribir, las lecturas de ese mismo usuario van al primario durante esta ventana
+DB_READ_AFTER_WRITE_SECONDS = float(os.getenv("DB_READ_AFTER_WRITE_SECONDS", "10"))
+
+# Registro de consultas lentas (opcional), consultable en /admin/system/slow-queries
+SLOW_QUERY_LOG = os.getenv("SLOW_QUERY_LOG", "false").lower() in ("1", "true", "yes")
+SLOW_QUERY_THRESHOLD_MS = float(os.getenv("SLOW_QUERY_THRESHOLD_MS", "200"))
+SLOW_QUERY_LOG_SIZE = int(os.getenv("SLOW_QUERY_LOG_SIZE", "100"))
+SLOW_QUERY_EXPLAIN = os.getenv("SLOW_QUERY_EXPLAIN", "true").lower() in ("1", "true", "yes")
+
+
+class _PoolInstrumentation:
+    """Pool mixin that records how long callers wait to check out a connection"""
+
+    _stats_lock = threading.Lock()
+
+    def _stats(self) -> dict:
+        if not hasattr(self, "_wait_stats"):
+            self._wait_stats = {"checkouts": 0, "timeouts": 0, "total_wait": 0.0, "max_wait": 0.0}
+        return self._wait_stats
+
+    def connect(self):
+        started_at = time.perf_counter()
+        timed_out = False
+        try:
+            return super().connect()
+        except exc.TimeoutError:
+            timed_out = True
+            raise
+        finally:
+            waited = time.perf_counter() - started_at
+            with self._stats_lock:
+                stats = self._stats()
+                stats["checkouts"] += 1
+                stats["timeouts"] += timed_out
+                stats["total_wait"] += waited
+                stats["max_wait"] = max(stats["max_wait"], waited)
+
+    def statistics(self) -> dict:
+        with self._stats_lock:
+            stats = dict(self._stats())
+        return {
+            "pool_size": self.size(),
+            "checked_out": self.checkedout(),
+            "checked_in": self.checkedin(),
+            "overflow": max(self.overflow(), 0),
+            "max_overflow": self._max_overflow,
+            "timeout_seconds": self._timeout,
+            "checkouts": stats["checkouts"],
+            "timeouts": stats["timeouts"],
+            "avg_wait_ms": round(stats["total_wait"] / stats["checkouts"] * 1000, 3) if stats["checkouts"] else 0,
+            "max_wait_ms": round(stats["max_wait"] * 1000, 3)
+        }
+
+
+class InstrumentedQueuePool(_PoolInstrumentation, QueuePool):
+    pass
+
+
+class InstrumentedAsyncQueuePool(_PoolInstrumentation, AsyncAdaptedQueuePool):
+    pass
+
+
+def _engine_options(url, poolclass) -> dict:
+    options = {"pool_pre_ping": DB_POOL_PRE_PING}
+    if url.get_backend_name() == "sqlite":
+        options["connect_args"] = {"check_same_thread": False}
+        if url.database in (None, "", ":memory:"):
+            return options
+    options.update(
+        poolclass=poolclass,
+        pool_size=DB_POOL_SIZE,
+        max_overflow=DB_MAX_OVERFLOW,
+        pool_timeout=DB_POOL_TIMEOUT,
+        pool_recycle=DB_POOL_RECYCLE
+    )
+    return options
+
+
+def create_db_engine(url: str):
+    """Create an engine with the pool settings taken from the environment"""
+    url = make_url(url)
+    return create_engine(url, **_engine_options(url, InstrumentedQueuePool))
+
+
+def create_async_db_engine(url: str):
+    """Create an asyncio engine with the same pool settings as the sync one"""
+    url = make_url(url)
+    return create_async_engine(url, **_engine_options(url, InstrumentedAsyncQueuePool))
+
+
+def pool_statistics(engine) -> dict:
+    pool = engine.pool
+    if isinstance(pool, _PoolInstrumentation):
+        return pool.statistics()
+    return {"pool": pool.status()}
+
+
+class ReplicaSet:
+    """Round-robin over read replicas, skipping the ones that failed the last background health check"""
+
+    def __init__(self, urls):
+        self.urls = urls
+        self.engines = [create_db_engine(url) for url in urls]
+        self.async_engines = [create_async_db_engine(to_async_url(url)) for url in urls]
+        self._counter = itertools.count()
+        # (índice, use_async) -> resultado de la última comprobación; sin comprobar cuenta como sana
+        self._health = {}
+        self._monitor = None
+
+    def choose(self, use_async: bool = False):
+        for _ in range(len(self.engines)):
+            index = next(self._counter) % len(self.engines)
+            # Solo lee el estado ya calculado: elegir réplica nunca abre conexiones
+            if self._health.get((index, use_async), True):
+                return self.async_engines[index].sync_engine if use_async else self.engines[index]
+        return None
 
-engine = create_engine(DATABASE_URL)
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+    def _ping(self, index: int) -> bool:
+        with self.engines[index].connect() as connection:
+            connection.exec_driver_sql("SELECT 1")
+        return True
+
+    async def _ping_async(self, index: int) -> bool:
+        async with self.async_engines[index].connect() as connection:
+            await connection.exec_driver_sql("SELECT 1")
+        return True
+
+    async def _healthy(self, check) -> bool:
+        try:
+            return await asyncio.wait_for(check, DB_REPLICA_HEALTH_CHECK_TIMEOUT)
+        except (asyncio.TimeoutError, exc.SQLAlchemyError, OSError):
+            return False
+
+    async def check(self) -> None:
+        """Health-check every replica through the sync and the async engine that serve its reads"""
+        checks = {}
+        for index in range(len(self.engines)):
+            # El motor síncrono se comprueba en un hilo para no bloquear el event loop
+            checks[(index, False)] = self._healthy(asyncio.to_thread(self._ping, index))
+            checks[(index, True)] = self._healthy(self._ping_async(index))
+        results = await asyncio.gather(*checks.values())
+        self._health.update(zip(checks, results))
+
+    async def _run_checks(self) -> None:
+        while True:
+            await self.check()
+            await asyncio.sleep(DB_REPLICA_HEALTH_CHECK_INTERVAL)
+
+    def start(self) -> None:
+        """Start the periodic health checks on the running event loop"""
+        if self.engines and self._monitor is None:
+            self._monitor = asyncio.get_running_loop().create_task(self._run_checks())
+
+    async def dispose(self) -> None:
+        if self._monitor is not None:
+            self._monitor.cancel()
+            with contextlib.suppress(asyncio.CancelledError):
+                await self._monitor
+            self._monitor = None
+        for async_engine in self.async_engines:
+            await async_engine.dispose()
+
+    def status(self) -> list:
+        return [
+            {
+                "url": make_url(url).render_as_string(hide_password=True),
+                "healthy": self._health.get((index, False), True) and self._health.get((index, True), True),
+                "pool": pool_statistics(self.engines[index])
+            }
+            for index, url in enumerate(self.urls)
+        ]
+
+
+engine = create_db_engine(DATABASE_URL)
 Base = declarative_base()
 
-def get_db():
-    db = SessionLocal()
+# Motor asíncrono para los handlers async: las esperas de la BD no bloquean el event loop
+async_engine = create_async_db_engine(ASYNC_DATABASE_URL)
+
+replicas = ReplicaSet(DATABASE_REPLICA_URLS)
+recent_writers = TTLCache(max_size=100000, ttl=DB_READ_AFTER_WRITE_SECONDS)
+
+slow_query_log = SlowQueryLog(SLOW_QUERY_THRESHOLD_MS, SLOW_QUERY_LOG_SIZE, SLOW_QUERY_EXPLAIN)
+if SLOW_QUERY_LOG:
+    for _engine in [engine, async_engine.sync_engine, *replicas.engines, *(e.sync_engine for e in replicas.async_engines)]:
+        slow_query_log.attach(_engine)
+
+
+class RoutingSession(Session):
+    """Session that sends reads of read-only requests to a replica and everything else to the primary"""
+
+    use_async = False
+
+    def _primary(self):
+        return async_engine.sync_engine if self.use_async else engine
+
+    def get_bind(self, mapper=None, clause=None, **kw):
+        if (
+            self.info.get("read_only")
+            and not self._flushing
+            and not self.info.get("has_writes")
+            and _request_principal(self) not in recent_writers
+        ):
+            replica = replicas.choose(self.use_async)
+            if replica is not None:
+                return replica
+        return self._primary()
+
+
+class AsyncRoutingSession(RoutingSession):
+    use_async = True
+
+
+def _request_principal(session):
+    request = session.info.get("request")
+    return getattr(request.state, "principal", None) if request is not None else None
+
+
+@event.listens_for(RoutingSession, "after_flush")
+def _mark_writes(session, flush_context):
+    session.info["has_writes"] = True
+
+
+@event.listens_for(RoutingSession, "after_commit")
+def _remember_writer(session):
+    if session.info.pop("has_writes", False):
+        principal = _request_principal(session)
+        if principal is not None:
+            recent_writers.set(principal, True)
+
+
+SessionLocal = sessionmaker(autocommit=False, autoflush=False, class_=RoutingSession)
+AsyncSessionLocal = async_sessionmaker(
+    sync_session_class=AsyncRoutingSession, autoflush=False, expire_on_commit=False
+)
+
+def get_db(request: Request):
+    db = SessionLocal(info={"request": request})
     try:
         yield db
     finally:
-        db.close()
\ No newline at end of file
+        db.close()
+
+def get_read_db(db: Session = Depends(get_db)):
+    """Session for read-only endpoints: queries may be served by a replica"""
+    db.info["read_only"] = True
+    return db
+
+async def get_async_db(request: Request):
+    async with AsyncSessionLocal(info={"request": request}) as db:
+        yield db
+
+async def get_async_read_db(db = Depends(get_async_db)):
+    db.sync_session.info["read_only"] = True
+    return db
@@ -0,0 +1,25 @@
+import os
+from alembic.config import Config
+from alembic.runtime.migration import MigrationContext
+from alembic.script import ScriptDirectory
+
+SERVER_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def migration_heads() -> set:
+    """Read the head revisions from the migration scripts, without touching the database"""
+    config = Config(os.path.join(SERVER_DIR, "alembic.ini"))
+    config.set_main_option("script_location", os.path.join(SERVER_DIR, "alembic"))
+    return set(ScriptDirectory.from_config(config).get_heads())
+
+
+def check_schema_revision(engine) -> None:
+    """Fail fast if the database has not been migrated to the current head"""
+    with engine.connect() as connection:
+        current = set(MigrationContext.configure(connection).get_current_heads())
+    expected = migration_heads()
+    if current != expected:
+        raise RuntimeError(
+            f"Database schema at revision {sorted(current) or 'none'}, expected {sorted(expected)}. "
+            "Run `alembic upgrade head`."
+        )
@@ -1,3 +1,5 @@
+import logging
+import os
 from fastapi import FastAPI, Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordRequestForm
 from fastapi.middleware.cors import CORSMiddleware
@@ -6,13 +8,17 @@ from datetime import timedelta
 from typing import List
 from routes import admin, trainer, user, metrics, progress
 from routes.goals import router as goals_router
-from config.database import get_db, engine, SessionLocal
+from config.database import get_db, engine, async_engine, replicas
 import models.models as models
 import schemas.schemas as schemas
 from utils.auth import *
+from utils.identity import resolve_identity
+from utils.rate_limit import login_rate_limit
+from utils.sql_instrumentation import QueryInstrumentationMiddleware
 
-# Crear todas las tablas
-models.Base.metadata.create_all(bind=engine)
+# El esquema se gestiona con Alembic (`alembic upgrade head`): al arrancar no se
+# refleja ninguna tabla. DB_SCHEMA_CHECK=true comprueba la revisión antes de servir.
+DB_SCHEMA_CHECK = os.getenv("DB_SCHEMA_CHECK", "false").lower() in ("1", "true", "yes")
 
 # Configuración de CORS
 origins = [
@@ -20,8 +26,14 @@ origins = [
     "http://localhost:3000",
 ]
 
+logging.basicConfig()
+logging.getLogger("fitness").setLevel(os.getenv("LOG_LEVEL", "INFO").upper())
+
 app = FastAPI(title="Fitness API")
 
+# Cuenta las consultas SQL de cada petición (cabecera Server-Timing y log estructurado)
+app.add_middleware(QueryInstrumentationMiddleware)
+
 # Middleware CORS
 app.add_middleware(
     CORSMiddleware,
@@ -29,100 +41,101 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    # Token de la siguiente página en los listados paginados por cursor
+    expose_headers=["X-Next-Cursor"],
 )
 
-@app.post("/token", response_model=schemas.Token)
+@app.post("/token", response_model=schemas.Token, dependencies=[Depends(login_rate_limit.by_ip)])
 async def login_for_access_token(
     form_data: OAuth2PasswordRequestForm = Depends(),
     db: Session = Depends(get_db)
 ):
-    # Buscar usuario en todas las tablas
-    user = None
-    role = None
-    
-    admin = db.query(models.Admin).filter(models.Admin.email == form_data.username).first()
-    if admin:
-        user = admin
-        role = "admin"
-    else:
-        trainer = db.query(models.Trainer).filter(models.Trainer.email == form_data.username).first()
-        if trainer:
-            user = trainer
-            role = "trainer"
-        else:
-            user = db.query(models.User).filter(models.User.email == form_data.username).first()
-            if user:
-                role = "user"
-
-    if not user or not verify_password(form_data.password, user.hashed_password):
+    login_rate_limit.check_account(form_data.username)
+
+    # Resolver el email con una sola consulta sobre el índice de identidades
+    identity = resolve_identity(db, form_data.username)
+
+    if not identity or not await verify_password_async(form_data.password, identity.hashed_password):
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Incorrect email or password",
             headers={"WWW-Authenticate": "Bearer"},
         )
+    role = identity.role
 
     access_token_expires = timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES)
     access_token = create_access_token(
-        data={"sub": user.email, "role": role}, 
+        data={"sub": identity.email, "role": role}, 
         expires_delta=access_token_expires
     )
+    refresh_token = create_refresh_token(db, identity.email, role)
+    db.commit()
     # Incluir el rol en la respuesta
     return {
         "access_token": access_token, 
         "token_type": "bearer",
-        "role": role  # Agregado el rol en la respuesta
+        "role": role,  # Agregado el rol en la respuesta
+        "refresh_token": refresh_token
     }
 
-@app.get("/")
-async def root():
-    return {"message": "Fitness API is running"}
-
-# Middleware para verificar roles
-async def get_current_user(
-    token: str = Depends(oauth2_scheme),
+@app.post("/token/refresh", response_model=schemas.Token)
+async def refresh_access_token(
+    request: schemas.RefreshTokenRequest,
     db: Session = Depends(get_db)
 ):
-    credentials_exception = HTTPException(
-        status_code=status.HTTP_401_UNAUTHORIZED,
-        detail="Could not validate credentials",
-        headers={"WWW-Authenticate": "Bearer"},
-    )
-    try:
-        payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
-        email: str = payload.get("sub")
-        role: str = payload.get("role")
-        if email is None:
-            raise credentials_exception
-        token_data = schemas.TokenData(email=email, role=role)
-    except JWTError:
-        raise credentials_exception
-    
-    if token_data.role == "admin":
-        user = db.query(models.Admin).filter(models.Admin.email == email).first()
-    elif token_data.role == "trainer":
-        user = db.query(models.Trainer).filter(models.Trainer.email == email).first()
-    else:
-        user = db.query(models.User).filter(models.User.email == email).first()
-    
-    if user is None:
-        raise credentials_exception
-    return {"user": user, "role": token_data.role}
-
-async def get_current_admin(current_user = Depends(get_current_user)):
-    if current_user["role"] != "admin":
-        raise HTTPException(
-            status_code=status.HTTP_403_FORBIDDEN,
-            detail="Only admins can access this resource"
-        )
-    return current_user
+    # Rotar el refresh token: el anterior queda revocado y se emite uno nuevo de la misma familia
+    record = rotate_refresh_token(db, request.refresh_token)
 
-async def get_current_trainer(current_user = Depends(get_current_user)):
-    if current_user["role"] not in ["admin", "trainer"]:
+    identity = resolve_identity(db, record.email)
+    if not identity or identity.role != record.role:
+        db.commit()
         raise HTTPException(
-            status_code=status.HTTP_403_FORBIDDEN,
-            detail="Only trainers can access this resource"
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Invalid refresh token",
+            headers={"WWW-Authenticate": "Bearer"},
         )
-    return current_user
+
+    access_token = create_access_token(
+        data={"sub": record.email, "role": record.role},
+        expires_delta=timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES)
+    )
+    refresh_token = create_refresh_token(db, record.email, record.role, family_id=record.family_id)
+    record.replaced_by = jwt.get_unverified_claims(refresh_token)["jti"]
+    db.commit()
+    return {
+        "access_token": access_token,
+        "token_type": "bearer",
+        "role": record.role,
+        "refresh_token": refresh_token
+    }
+
+@app.post("/token/revoke")
+async def revoke_token(
+    request: schemas.RefreshTokenRequest,
+    db: Session = Depends(get_db)
+):
+    revoke_refresh_token(db, request.refresh_token)
+    return {"message": "Token revoked"}
+
+@app.on_event("startup")
+def verify_schema():
+    if DB_SCHEMA_CHECK:
+        # Alembic solo se importa cuando la comprobación está activada
+        from config.schema import check_schema_revision
+        check_schema_revision(engine)
+
+@app.on_event("startup")
+async def start_replica_health_checks():
+    replicas.start()
+
+@app.on_event("shutdown")
+async def dispose_async_engine():
+    await async_engine.dispose()
+    await replicas.dispose()
+
+@app.get("/")
+async def root():
+    return {"message": "Fitness API is running"}
 
 # Incluir routers
 app.include_router(admin.router)
@@ -0,0 +1,63 @@
+"""Maintenance commands.
+
+Usage (from the server directory):
+
+    python manage.py reconcile-counters
+    python manage.py rebuild-identity-index
+    python manage.py rebuild-rollups [--user-id ID]
+    python manage.py rebuild-progress-summaries [--user-id ID]
+"""
+import argparse
+
+from config.database import SessionLocal
+from utils import dashboard
+from utils.identity import rebuild_identity_index
+from utils.progress_summary import rebuild_progress_summaries
+from utils.rollups import rebuild_daily_rollups
+
+
+def reconcile_counters(db, args):
+    totals = dashboard.reconcile_dashboard_counters(db)
+    print("Dashboard counters reconciled: " + ", ".join(f"{name}={count}" for name, count in totals.items()))
+
+
+def rebuild_identities(db, args):
+    print(f"Identity index rebuilt: {rebuild_identity_index(db)} accounts")
+
+
+def rebuild_rollups(db, args):
+    rows = rebuild_daily_rollups(db, args.user_id)
+    print(f"Daily rollups rebuilt: {rows} rows")
+
+
+def rebuild_summaries(db, args):
+    rows = rebuild_progress_summaries(db, args.user_id)
+    print(f"Progress summaries rebuilt: {rows} users")
+
+
+COMMANDS = {
+    "reconcile-counters": (reconcile_counters, "recount the totals in dashboard_counters"),
+    "rebuild-identity-index": (rebuild_identities, "rebuild the accounts table from admins, trainers and users"),
+    "rebuild-rollups": (rebuild_rollups, "recompute the daily workout and nutrition rollups"),
+    "rebuild-progress-summaries": (rebuild_summaries, "recompute the per-user first/latest metrics summary"),
+}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    for name, (handler, help_text) in COMMANDS.items():
+        subparsers.add_parser(name, help=help_text).set_defaults(handler=handler)
+    for name in ("rebuild-rollups", "rebuild-progress-summaries"):
+        subparsers.choices[name].add_argument("--user-id", type=int, help="only this user")
+    args = parser.parse_args()
+
+    db = SessionLocal()
+    try:
+        args.handler(db, args)
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -1,5 +1,5 @@
 from datetime import datetime
-from sqlalchemy import Boolean, Column, Float, ForeignKey, Integer, String, Text, Table, DateTime
+from sqlalchemy import Boolean, Column, Date, Float, ForeignKey, Index, Integer, String, Text, Table, DateTime, UniqueConstraint
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
 from config.database import Base
@@ -9,16 +9,45 @@ user_workout_plans = Table(
     'user_workout_plans',
     Base.metadata,
     Column('user_id', Integer, ForeignKey('users.id', ondelete='CASCADE'), primary_key=True),
-    Column('workout_plan_id', Integer, ForeignKey('workout_plans.id', ondelete='CASCADE'), primary_key=True)
+    Column('workout_plan_id', Integer, ForeignKey('workout_plans.id', ondelete='CASCADE'), primary_key=True),
+    # Índice inverso: usuarios de un plan (la PK ya cubre user_id -> plan)
+    Index('ix_user_workout_plans_plan_user', 'workout_plan_id', 'user_id')
 )
 
 user_nutrition_plans = Table(
     'user_nutrition_plans',
     Base.metadata,
     Column('user_id', Integer, ForeignKey('users.id', ondelete='CASCADE'), primary_key=True),
-    Column('nutrition_plan_id', Integer, ForeignKey('nutrition_plans.id', ondelete='CASCADE'), primary_key=True)
+    Column('nutrition_plan_id', Integer, ForeignKey('nutrition_plans.id', ondelete='CASCADE'), primary_key=True),
+    Index('ix_user_nutrition_plans_plan_user', 'nutrition_plan_id', 'user_id')
 )
 
+class Account(Base):
+    # Índice de identidades: resuelve cualquier email a (rol, id) en una sola consulta.
+    # Se mantiene sincronizado desde utils/identity.py al crear, editar o borrar cuentas.
+    __tablename__ = "accounts"
+    __table_args__ = (
+        UniqueConstraint("role", "account_id", name="uq_accounts_role_account_id"),
+    )
+    id = Column(Integer, primary_key=True, index=True)
+    email = Column(String(255), nullable=False, index=True)
+    role = Column(String(16), nullable=False)
+    account_id = Column(Integer, nullable=False)
+    hashed_password = Column(String(255))
+
+class RefreshToken(Base):
+    # Registro de refresh tokens emitidos: permite rotarlos y revocarlos en el servidor
+    __tablename__ = "refresh_tokens"
+    id = Column(Integer, primary_key=True, index=True)
+    jti = Column(String(64), unique=True, index=True, nullable=False)
+    family_id = Column(String(64), index=True, nullable=False)
+    email = Column(String(255), nullable=False)
+    role = Column(String(16), nullable=False)
+    expires_at = Column(DateTime, nullable=False)
+    revoked_at = Column(DateTime, nullable=True)
+    replaced_by = Column(String(64), nullable=True)
+    created_at = Column(DateTime, default=datetime.utcnow)
+
 class Admin(Base):
     __tablename__ = "admins"
     id = Column(Integer, primary_key=True, index=True)
@@ -40,7 +69,7 @@ class Trainer(Base):
     certification = Column(Text)
     biography = Column(Text)
     admin_id = Column(Integer, ForeignKey("admins.id"))
-    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    created_at = Column(DateTime(timezone=True), server_default=func.now(), index=True)
     
     admin = relationship("Admin", back_populates="trainers")
     users = relationship("User", back_populates="trainer")
@@ -51,16 +80,16 @@ class Trainer(Base):
 class User(Base):
     __tablename__ = "users"
     id = Column(Integer, primary_key=True, index=True)
-    email = Column(String, unique=True, index=True)
-    full_name = Column(String)
-    hashed_password = Column(String)
+    email = Column(String(255), unique=True, index=True)
+    full_name = Column(String(255))
+    hashed_password = Column(String(255))
     height = Column(Float, nullable=True)
     target_weight = Column(Float, nullable=True)
-    fitness_goal = Column(String, nullable=True)
-    health_conditions = Column(String, nullable=True)
-    emergency_contact = Column(String, nullable=True)
+    fitness_goal = Column(String(255), nullable=True)
+    health_conditions = Column(String(255), nullable=True)
+    emergency_contact = Column(String(255), nullable=True)
     trainer_id = Column(Integer, ForeignKey("trainers.id"), nullable=True)
-    created_at = Column(DateTime, default=datetime.utcnow)
+    created_at = Column(DateTime, default=datetime.utcnow, index=True)
 
     # Campos de objetivos
     weight_goal = Column(Float, nullable=True)
@@ -153,6 +182,10 @@ class Meal(Base):
 
 class UserMetrics(Base):
     __tablename__ = "user_metrics"
+    # Las consultas analíticas filtran por usuario y rango de fechas, ordenando por fecha
+    __table_args__ = (
+        Index("ix_user_metrics_user_date", "user_id", "date"),
+    )
     id = Column(Integer, primary_key=True, index=True)
     user_id = Column(Integer, ForeignKey("users.id", ondelete='CASCADE'))
     date = Column(DateTime(timezone=True), nullable=False)
@@ -168,6 +201,10 @@ class UserMetrics(Base):
 
 class WorkoutProgress(Base):
     __tablename__ = "workout_progress"
+    __table_args__ = (
+        Index("ix_workout_progress_user_date", "user_id", "date"),
+        Index("ix_workout_progress_user_plan_date", "user_id", "workout_plan_id", "date"),
+    )
     id = Column(Integer, primary_key=True, index=True)
     user_id = Column(Integer, ForeignKey("users.id", ondelete='CASCADE'))
     workout_plan_id = Column(Integer, ForeignKey("workout_plans.id", ondelete='CASCADE'))
@@ -181,6 +218,10 @@ class WorkoutProgress(Base):
 
 class NutritionProgress(Base):
     __tablename__ = "nutrition_progress"
+    __table_args__ = (
+        Index("ix_nutrition_progress_user_date", "user_id", "date"),
+        Index("ix_nutrition_progress_user_plan_date", "user_id", "nutrition_plan_id", "date"),
+    )
     id = Column(Integer, primary_key=True, index=True)
     user_id = Column(Integer, ForeignKey("users.id", ondelete='CASCADE'))
     nutrition_plan_id = Column(Integer, ForeignKey("nutrition_plans.id", ondelete='CASCADE'))
@@ -190,4 +231,43 @@ class NutritionProgress(Base):
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     
     user = relationship("User", back_populates="nutrition_progress")
-    nutrition_plan = relationship("NutritionPlan", back_populates="progress")
\ No newline at end of file
+    nutrition_plan = relationship("NutritionPlan", back_populates="progress")
+
+class WorkoutDailyRollup(Base):
+    # Resumen diario de workout_progress por usuario, mantenido en cada registro de progreso
+    __tablename__ = "workout_daily_rollups"
+    user_id = Column(Integer, ForeignKey("users.id", ondelete='CASCADE'), primary_key=True)
+    day = Column(Date, primary_key=True)
+    total = Column(Integer, nullable=False, default=0)
+    completed = Column(Integer, nullable=False, default=0)
+
+class NutritionDailyRollup(Base):
+    __tablename__ = "nutrition_daily_rollups"
+    user_id = Column(Integer, ForeignKey("users.id", ondelete='CASCADE'), primary_key=True)
+    day = Column(Date, primary_key=True)
+    total = Column(Integer, nullable=False, default=0)
+    completed = Column(Integer, nullable=False, default=0)
+
+class DashboardCounters(Base):
+    # Fila única con los totales del panel de administración, mantenida en cada alta/baja
+    __tablename__ = "dashboard_counters"
+    id = Column(Integer, primary_key=True)
+    users = Column(Integer, nullable=False, default=0)
+    trainers = Column(Integer, nullable=False, default=0)
+    workout_plans = Column(Integer, nullable=False, default=0)
+    nutrition_plans = Column(Integer, nullable=False, default=0)
+    reconciled_at = Column(DateTime(timezone=True), nullable=True)
+
+class UserProgressSummary(Base):
+    # Primera y última medición de cada usuario, mantenida en cada alta de métricas
+    __tablename__ = "user_progress_summaries"
+    user_id = Column(Integer, ForeignKey("users.id", ondelete='CASCADE'), primary_key=True)
+    metrics_count = Column(Integer, nullable=False, default=0)
+    first_date = Column(DateTime(timezone=True), nullable=False)
+    first_weight = Column(Float)
+    first_body_fat = Column(Float)
+    first_muscle_mass = Column(Float)
+    latest_date = Column(DateTime(timezone=True), nullable=False)
+    latest_weight = Column(Float)
+    latest_body_fat = Column(Float)
+    latest_muscle_mass = Column(Float)
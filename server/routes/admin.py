@@ -1,14 +1,18 @@
-from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy.orm import Session, joinedload
+from fastapi import APIRouter, Depends, HTTPException, Query, Response, status
+from sqlalchemy.orm import Session, selectinload
 from typing import List, Optional
 from pydantic import BaseModel
 from datetime import datetime, timedelta
 import secrets
-from config.database import get_db
+from config.database import get_db, get_read_db, engine, async_engine, pool_statistics, replicas, slow_query_log, SLOW_QUERY_LOG
 import models.models as models
 import schemas.schemas as schemas
-from utils.auth import get_current_admin, get_current_trainer, get_password_hash
+from utils.auth import get_current_admin, get_current_trainer, get_password_hash, get_password_hash_async, password_hasher
 from utils.email import send_reset_email
+from utils.identity import resolve_identity, load_account
+from utils import dashboard
+from utils.pagination import keyset_list
+from utils.rate_limit import password_reset_request_rate_limit, password_reset_rate_limit
 
 router = APIRouter(prefix="/admin", tags=["admin"])
 
@@ -55,13 +59,18 @@ def create_trainer(
 
 @router.get("/trainers/", response_model=List[schemas.Trainer])
 def read_trainers(
+    response: Response,
     skip: int = 0,
-    limit: int = 100,
+    limit: int = Query(100, ge=1),
+    cursor: Optional[str] = None,
+    search: Optional[str] = None,
     current_user = Depends(get_current_admin),
     db: Session = Depends(get_db)
 ):
-    trainers = db.query(models.Trainer).offset(skip).limit(limit).all()
-    return trainers
+    query = db.query(models.Trainer)
+    if search:
+        query = query.filter(models.Trainer.email.startswith(search, autoescape=True))
+    return keyset_list(query, [models.Trainer.id], response, cursor, skip, limit)
 
 @router.post("/users/", response_model=schemas.User)
 def create_user(
@@ -105,13 +114,18 @@ def create_user(
 
 @router.get("/users/", response_model=List[schemas.User])
 def read_users(
+    response: Response,
     skip: int = 0,
-    limit: int = 100,
+    limit: int = Query(100, ge=1),
+    cursor: Optional[str] = None,
+    search: Optional[str] = None,
     current_user = Depends(get_current_admin),
     db: Session = Depends(get_db)
 ):
-    users = db.query(models.User).offset(skip).limit(limit).all()
-    return users
+    query = db.query(models.User)
+    if search:
+        query = query.filter(models.User.email.startswith(search, autoescape=True))
+    return keyset_list(query, [models.User.id], response, cursor, skip, limit)
 
 @router.put("/users/{user_id}", response_model=schemas.User)
 async def update_user(
@@ -137,7 +151,7 @@ async def update_user(
         
         for key, value in user_data.dict(exclude_unset=True).items():
             if key == "password" and value:
-                setattr(db_user, "hashed_password", get_password_hash(value))
+                setattr(db_user, "hashed_password", await get_password_hash_async(value))
             else:
                 setattr(db_user, key, value)
         
@@ -170,27 +184,33 @@ def delete_user(
 
 @router.get("/workout-plans/", response_model=List[schemas.WorkoutPlan])
 async def read_workout_plans(
+    response: Response,
     skip: int = 0,
-    limit: int = 100,
+    limit: int = Query(100, ge=1),
+    cursor: Optional[str] = None,
+    search: Optional[str] = None,
     db: Session = Depends(get_db),
     current_user = Depends(get_current_admin)
 ):
-    plans = db.query(models.WorkoutPlan)\
-        .options(joinedload(models.WorkoutPlan.exercises))\
-        .offset(skip)\
-        .limit(limit)\
-        .all()
-    return plans
+    query = db.query(models.WorkoutPlan).options(selectinload(models.WorkoutPlan.exercises))
+    if search:
+        query = query.filter(models.WorkoutPlan.name.startswith(search, autoescape=True))
+    return keyset_list(query, [models.WorkoutPlan.id], response, cursor, skip, limit)
 
 @router.get("/routines/", response_model=List[schemas.Routine])
 def read_routines(
+    response: Response,
     skip: int = 0,
-    limit: int = 100,
+    limit: int = Query(100, ge=1),
+    cursor: Optional[str] = None,
+    search: Optional[str] = None,
     current_user = Depends(get_current_admin),
     db: Session = Depends(get_db)
 ):
-    routines = db.query(models.Routine).offset(skip).limit(limit).all()
-    return routines
+    query = db.query(models.Routine)
+    if search:
+        query = query.filter(models.Routine.name.startswith(search, autoescape=True))
+    return keyset_list(query, [models.Routine.id], response, cursor, skip, limit)
 
 @router.post("/routines/", response_model=schemas.Routine)
 def create_routine(
@@ -277,17 +297,18 @@ def delete_routine(
 
 @router.get("/nutrition-plans/", response_model=List[schemas.NutritionPlan])
 def read_nutrition_plans(
+    response: Response,
     skip: int = 0,
-    limit: int = 100,
+    limit: int = Query(100, ge=1),
+    cursor: Optional[str] = None,
+    search: Optional[str] = None,
     current_user = Depends(get_current_admin),
     db: Session = Depends(get_db)
 ):
-    nutrition_plans = db.query(models.NutritionPlan)\
-        .options(joinedload(models.NutritionPlan.meals))\
-        .offset(skip)\
-        .limit(limit)\
-        .all()
-    return nutrition_plans
+    query = db.query(models.NutritionPlan).options(selectinload(models.NutritionPlan.meals))
+    if search:
+        query = query.filter(models.NutritionPlan.name.startswith(search, autoescape=True))
+    return keyset_list(query, [models.NutritionPlan.id], response, cursor, skip, limit)
 
 @router.put("/trainers/{trainer_id}", response_model=schemas.Trainer)
 async def update_trainer(
@@ -312,7 +333,7 @@ async def update_trainer(
     
     for key, value in trainer_data.dict(exclude_unset=True).items():
         if key == "password" and value:
-            setattr(db_trainer, "hashed_password", get_password_hash(value))
+            setattr(db_trainer, "hashed_password", await get_password_hash_async(value))
         else:
             setattr(db_trainer, key, value)
     
@@ -361,7 +382,7 @@ async def create_admin(
 
     db_admin = models.Admin(
         email=admin.email,
-        hashed_password=get_password_hash(admin.password),
+        hashed_password=await get_password_hash_async(admin.password),
         full_name=admin.full_name
     )
     db.add(db_admin)
@@ -371,13 +392,18 @@ async def create_admin(
 
 @router.get("/admins/", response_model=List[schemas.Admin])
 async def get_admins(
+    response: Response,
     skip: int = 0,
-    limit: int = 100,
+    limit: int = Query(100, ge=1),
+    cursor: Optional[str] = None,
+    search: Optional[str] = None,
     current_user = Depends(get_current_admin),
     db: Session = Depends(get_db)
 ):
-    admins = db.query(models.Admin).offset(skip).limit(limit).all()
-    return admins
+    query = db.query(models.Admin)
+    if search:
+        query = query.filter(models.Admin.email.startswith(search, autoescape=True))
+    return keyset_list(query, [models.Admin.id], response, cursor, skip, limit)
 
 @router.put("/admin/{admin_id}", response_model=schemas.Admin)
 async def update_admin(
@@ -404,7 +430,7 @@ async def update_admin(
     
     for key, value in admin_data.dict(exclude_unset=True).items():
         if key == "password" and value:
-            setattr(db_admin, "hashed_password", get_password_hash(value))
+            setattr(db_admin, "hashed_password", await get_password_hash_async(value))
         else:
             setattr(db_admin, key, value)
     
@@ -440,18 +466,17 @@ async def delete_admin(
     db.commit()
     return {"message": "Admin deleted"}
 
-@router.post("/request-password-reset/")
+@router.post("/request-password-reset/", dependencies=[Depends(password_reset_request_rate_limit.by_ip)])
 async def request_password_reset(
     request: schemas.AdminLoginReset,
     db: Session = Depends(get_db)
 ):
-    # Buscar en todas las tablas
-    user = None
-    admin = db.query(models.Admin).filter(models.Admin.email == request.email).first()
-    trainer = db.query(models.Trainer).filter(models.Trainer.email == request.email).first()
-    user = db.query(models.User).filter(models.User.email == request.email).first()
+    password_reset_request_rate_limit.check_account(request.email)
 
-    if not any([admin, trainer, user]):
+    # Buscar el email en el índice de identidades
+    identity = resolve_identity(db, request.email)
+
+    if not identity:
         # Por seguridad, no revelamos si el email existe o no
         return {"message": "Si el email existe, recibirás instrucciones para resetear tu contraseña"}
 
@@ -472,7 +497,7 @@ async def request_password_reset(
             detail="Error al enviar el email de recuperación"
         )
 
-@router.post("/reset-password/")
+@router.post("/reset-password/", dependencies=[Depends(password_reset_rate_limit.by_ip)])
 async def reset_password(
     reset_data: schemas.PasswordReset,
     db: Session = Depends(get_db)
@@ -486,22 +511,15 @@ async def reset_password(
         raise HTTPException(status_code=400, detail="Token expirado")
 
     # Actualizar contraseña en la tabla correspondiente
-    user = None
-    admin = db.query(models.Admin).filter(models.Admin.email == token_data["email"]).first()
-    trainer = db.query(models.Trainer).filter(models.Trainer.email == token_data["email"]).first()
-    user = db.query(models.User).filter(models.User.email == token_data["email"]).first()
+    identity = resolve_identity(db, token_data["email"])
+    account = load_account(db, identity) if identity else None
 
-    new_password_hash = get_password_hash(reset_data.new_password)
+    new_password_hash = await get_password_hash_async(reset_data.new_password)
 
     try:
-        if admin:
-            admin.hashed_password = new_password_hash
-        elif trainer:
-            trainer.hashed_password = new_password_hash
-        elif user:
-            user.hashed_password = new_password_hash
-        else:
+        if not account:
             raise HTTPException(status_code=404, detail="Usuario no encontrado")
+        account.hashed_password = new_password_hash
 
         db.commit()
         del reset_tokens[reset_data.token]
@@ -514,38 +532,19 @@ async def reset_password(
         )
 
 @router.get("/dashboard/stats")
-async def get_dashboard_stats(
+def get_dashboard_stats(
     current_user = Depends(get_current_admin),
-    db: Session = Depends(get_db)
+    db: Session = Depends(get_read_db)
 ):
-    total_users = db.query(models.User).count()
-    total_trainers = db.query(models.Trainer).count()
-    total_workout_plans = db.query(models.WorkoutPlan).count()
-    total_nutrition_plans = db.query(models.NutritionPlan).count()
-    
-    # Estadísticas de los últimos 30 días
-    thirty_days_ago = datetime.utcnow() - timedelta(days=30)
-    
-    new_users = db.query(models.User).filter(
-        models.User.created_at >= thirty_days_ago
-    ).count() if hasattr(models.User, 'created_at') else 0
-    
-    new_trainers = db.query(models.Trainer).filter(
-        models.Trainer.created_at >= thirty_days_ago
-    ).count() if hasattr(models.Trainer, 'created_at') else 0
+    # Los totales salen de la fila de dashboard_counters, no de un COUNT por tabla
+    return dashboard.get_admin_dashboard_stats(db)
 
-    return {
-        "total_stats": {
-            "users": total_users,
-            "trainers": total_trainers,
-            "workout_plans": total_workout_plans,
-            "nutrition_plans": total_nutrition_plans
-        },
-        "monthly_stats": {
-            "new_users": new_users,
-            "new_trainers": new_trainers
-        }
-    }
+@router.post("/system/dashboard-counters/reconcile")
+def reconcile_dashboard_counters(
+    current_user = Depends(get_current_admin),
+    db: Session = Depends(get_db)
+):
+    return {"totals": dashboard.reconcile_dashboard_counters(db)}
 
 # routes/admin.py
 
@@ -555,11 +554,14 @@ async def get_user_plans(
     db: Session = Depends(get_db),
     current_user = Depends(get_current_admin)
 ):
-    user = db.query(models.User).filter(models.User.id == user_id).first()
+    # Cargar los planes con sus ejercicios y comidas en un número fijo de consultas
+    user = db.query(models.User).options(
+        selectinload(models.User.workout_plans).selectinload(models.WorkoutPlan.exercises),
+        selectinload(models.User.nutrition_plans).selectinload(models.NutritionPlan.meals)
+    ).filter(models.User.id == user_id).first()
     if not user:
         raise HTTPException(status_code=404, detail="Usuario no encontrado")
     
-    # Cargar explícitamente las relaciones
     workout_plans = [
         {
             "id": plan.id,
@@ -619,4 +621,38 @@ async def check_system_health(
         raise HTTPException(
             status_code=503,
             detail=f"Sistema no disponible: {str(e)}"
-        )
\ No newline at end of file
+        )
+
+@router.get("/system/password-hashing")
+async def get_password_hashing_stats(
+    current_user = Depends(get_current_admin)
+):
+    return password_hasher.stats()
+
+@router.get("/system/db-pool")
+async def get_db_pool_stats(
+    current_user = Depends(get_current_admin)
+):
+    return {
+        "sync": pool_statistics(engine),
+        "async": pool_statistics(async_engine.sync_engine),
+        "replicas": replicas.status()
+    }
+
+@router.get("/system/slow-queries")
+async def get_slow_queries(
+    limit: int = 50,
+    current_user = Depends(get_current_admin)
+):
+    # Las más recientes primero; vacío si SLOW_QUERY_LOG no está activado
+    return {
+        "enabled": SLOW_QUERY_LOG,
+        **slow_query_log.stats(),
+        "entries": slow_query_log.entries(limit)
+    }
+
+@router.delete("/system/slow-queries", status_code=status.HTTP_204_NO_CONTENT)
+async def clear_slow_queries(
+    current_user = Depends(get_current_admin)
+):
+    slow_query_log.clear()
@@ -1,29 +1,34 @@
-from fastapi import APIRouter, Depends, HTTPException, status, Response
+from fastapi import APIRouter, Depends, HTTPException, Query, status, Response
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
-from typing import List
+from typing import List, Optional
 from datetime import date, datetime, timedelta
-from config.database import get_db
+from config.database import get_async_db, get_read_db, get_async_read_db
 import models.models as models
 import schemas.schemas as schemas
 from utils.auth import get_current_user, get_current_trainer
-from utils.metrics import calculate_bmi, calculate_progress_stats, get_user_completion_rates
-from utils.reports import generate_user_report
+from utils import analytics
+from utils.metrics import calculate_bmi, calculate_progress_stats, get_user_completion_rates, summary_progress_stats
 
 router = APIRouter(prefix="/metrics", tags=["metrics"])
 
+MAX_SERIES_POINTS = 10000
+
 @router.post("/user/{user_id}/metrics", response_model=schemas.UserMetrics)
 async def create_user_metrics(
     user_id: int,
     metrics: schemas.UserMetricsCreate,
     current_user = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     # Verificar permisos
     if current_user["role"] not in ["admin", "trainer"] and current_user["user"].id != user_id:
         raise HTTPException(status_code=403, detail="No tienes permiso para crear métricas para este usuario")
     
     # Verificar si el usuario existe
-    user = db.query(models.User).filter(models.User.id == user_id).first()
+    user = await db.get(models.User, user_id)
     if not user:
         raise HTTPException(status_code=404, detail="Usuario no encontrado")
     
@@ -39,8 +44,8 @@ async def create_user_metrics(
         db_metrics.bmi = calculate_bmi(metrics.weight, user.height)
     
     db.add(db_metrics)
-    db.commit()
-    db.refresh(db_metrics)
+    await db.commit()
+    await db.refresh(db_metrics)
     return db_metrics
 
 @router.get("/user/{user_id}/metrics", response_model=List[schemas.UserMetrics])
@@ -48,49 +53,91 @@ async def get_user_metrics(
     user_id: int,
     start_date: date = None,
     end_date: date = None,
+    max_points: Optional[int] = Query(None, ge=3, le=MAX_SERIES_POINTS),
     current_user = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_read_db)
 ):
     # Verificar permisos
     if current_user["role"] not in ["admin", "trainer"] and current_user["user"].id != user_id:
         raise HTTPException(status_code=403, detail="No tienes permiso para ver las métricas de este usuario")
     
-    query = db.query(models.UserMetrics).filter(models.UserMetrics.user_id == user_id)
+    query = select(models.UserMetrics).where(models.UserMetrics.user_id == user_id)
     
     if start_date:
-        query = query.filter(models.UserMetrics.date >= start_date)
+        query = query.where(models.UserMetrics.date >= start_date)
     if end_date:
-        query = query.filter(models.UserMetrics.date <= end_date)
+        query = query.where(models.UserMetrics.date <= end_date)
+    
+    result = await db.scalars(query.order_by(models.UserMetrics.date.desc()))
+    metrics = result.all()
+    if max_points and len(metrics) > max_points:
+        # LTTB sobre la serie cronológica; la respuesta mantiene el orden descendente
+        chronological = metrics[::-1]
+        series = analytics.to_arrays([
+            (row.date, *(getattr(row, field) for field in analytics.METRIC_FIELDS)) for row in chronological
+        ])
+        metrics = [chronological[index] for index in analytics.downsample(series, max_points)[::-1]]
+    return metrics
+
+@router.get("/user/{user_id}/analytics")
+async def get_user_metrics_analytics(
+    user_id: int,
+    start_date: date = None,
+    end_date: date = None,
+    window_days: float = Query(7, gt=0, le=365),
+    include_series: bool = True,
+    current_user = Depends(get_current_user),
+    db: AsyncSession = Depends(get_async_read_db)
+):
+    if current_user["role"] not in ["admin", "trainer"] and current_user["user"].id != user_id:
+        raise HTTPException(status_code=403, detail="No tienes permiso para ver las métricas de este usuario")
     
-    return query.order_by(models.UserMetrics.date.desc()).all()
+    # Una consulta por columnas (sin objetos ORM) y el cálculo vectorizado en NumPy
+    result = await db.execute(analytics.metric_series_query(user_id, start_date, end_date))
+    series = analytics.to_arrays(result.all())
+    return {
+        "user_id": user_id,
+        "start_date": start_date,
+        "end_date": end_date,
+        **analytics.analyze_series(series, window_days, include_series)
+    }
 
 @router.get("/user/{user_id}/progress", response_model=schemas.UserStats)
 async def get_user_progress(
     user_id: int,
     start_date: date = None,
     end_date: date = None,
+    all_time: bool = False,
     current_user = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_read_db)
 ):
     # Verificar permisos
     if current_user["role"] not in ["admin", "trainer"] and current_user["user"].id != user_id:
         raise HTTPException(status_code=403, detail="No tienes permiso para ver el progreso de este usuario")
     
-    if not start_date:
-        start_date = date.today() - timedelta(days=30)
-    if not end_date:
-        end_date = date.today()
-    
-    # Obtener estadísticas de progreso
-    completion_rates = get_user_completion_rates(db, user_id, start_date, end_date)
-    
-    # Obtener métricas
-    metrics = db.query(models.UserMetrics).filter(
-        models.UserMetrics.user_id == user_id,
-        models.UserMetrics.date.between(start_date, end_date)
-    ).order_by(models.UserMetrics.date).all()
-    
-    metrics_stats = calculate_progress_stats(metrics)
+    if all_time:
+        # Todo el historial: resúmenes diarios sin límites y la fila de resumen de métricas
+        completion_rates = await db.run_sync(get_user_completion_rates, user_id, None, None)
+        metrics_stats = summary_progress_stats(await db.get(models.UserProgressSummary, user_id))
+    else:
+        if not start_date:
+            start_date = date.today() - timedelta(days=30)
+        if not end_date:
+            end_date = date.today()
+        
+        # Obtener estadísticas de progreso
+        completion_rates = await db.run_sync(get_user_completion_rates, user_id, start_date, end_date)
+        
+        # Obtener métricas
+        result = await db.scalars(
+            select(models.UserMetrics).where(
+                models.UserMetrics.user_id == user_id,
+                models.UserMetrics.date.between(start_date, end_date)
+            ).order_by(models.UserMetrics.date)
+        )
+        metrics = result.all()
+        
+        metrics_stats = calculate_progress_stats(metrics)
     
     return {
         "total_workouts": completion_rates["workout"]["total"],
@@ -111,7 +158,7 @@ async def get_user_report(
     start_date: date = None,
     end_date: date = None,
     current_user = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: Session = Depends(get_read_db)
 ):
     if current_user["role"] not in ["admin", "trainer"] and current_user["user"].id != user_id:
         raise HTTPException(status_code=403, detail="No tienes permiso para generar reportes para este usuario")
@@ -123,7 +170,10 @@ async def get_user_report(
     
     
     try:
-        pdf_content = generate_user_report(db, user_id, start_date, end_date)
+        # matplotlib y fpdf solo se cargan al pedir el primer reporte, no al arrancar el worker
+        from utils.reports import generate_user_report
+        # La generación del PDF es costosa en CPU: se ejecuta fuera del event loop
+        pdf_content = await run_in_threadpool(generate_user_report, db, user_id, start_date, end_date)
         return Response(
             content=pdf_content,
             media_type="application/pdf",
@@ -1,8 +1,9 @@
 from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy.orm import Session
+from sqlalchemy import exists, select
+from sqlalchemy.ext.asyncio import AsyncSession
 from typing import List
 from datetime import date
-from config.database import get_db
+from config.database import get_async_db, get_async_read_db
 import models.models as models
 import schemas.schemas as schemas
 from utils.auth import get_current_user, get_current_trainer
@@ -13,21 +14,22 @@ router = APIRouter(prefix="/progress", tags=["progress"])
 async def record_workout_progress(
     progress: schemas.WorkoutProgressCreate,
     current_user = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     
-    workout_plan = db.query(models.WorkoutPlan).filter(
-        models.WorkoutPlan.i)
-    
-    workout_plan = db.query(models.WorkoutPlan).filter(
-        models.WorkoutPlan.id == progress.workout_plan_id
-    ).first()
+    # Existencia del plan y asignación en una sola consulta (EXISTS sobre la PK de user_workout_plans)
+    is_assigned = exists().where(
+        models.user_workout_plans.c.user_id == current_user["user"].id,
+        models.user_workout_plans.c.workout_plan_id == models.WorkoutPlan.id
+    )
+    plan = (await db.execute(
+        select(models.WorkoutPlan.id, is_assigned).where(models.WorkoutPlan.id == progress.workout_plan_id)
+    )).first()
     
-    if not workout_plan:
+    if not plan:
         raise HTTPException(status_code=404, detail="Plan de entrenamiento no encontrado")
     
-    
-    if workout_plan.id not in [p.id for p in current_user["user"].workout_plans]:
+    if not plan[1]:
         raise HTTPException(status_code=403, detail="No tienes acceso a este plan")
     
     
@@ -36,26 +38,30 @@ async def record_workout_progress(
         **progress.dict()
     )
     db.add(db_progress)
-    db.commit()
-    db.refresh(db_progress)
+    await db.commit()
+    await db.refresh(db_progress)
     return db_progress
 
 @router.post("/nutrition", response_model=schemas.NutritionProgress)
 async def record_nutrition_progress(
     progress: schemas.NutritionProgressCreate,
     current_user = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     
-    nutrition_plan = db.query(models.NutritionPlan).filter(
-        models.NutritionPlan.id == progress.nutrition_plan_id
-    ).first()
+    # Existencia del plan y asignación en una sola consulta (EXISTS sobre la PK de user_nutrition_plans)
+    is_assigned = exists().where(
+        models.user_nutrition_plans.c.user_id == current_user["user"].id,
+        models.user_nutrition_plans.c.nutrition_plan_id == models.NutritionPlan.id
+    )
+    plan = (await db.execute(
+        select(models.NutritionPlan.id, is_assigned).where(models.NutritionPlan.id == progress.nutrition_plan_id)
+    )).first()
     
-    if not nutrition_plan:
+    if not plan:
         raise HTTPException(status_code=404, detail="Plan nutricional no encontrado")
     
-   
-    if nutrition_plan.id not in [p.id for p in current_user["user"].nutrition_plans]:
+    if not plan[1]:
         raise HTTPException(status_code=403, detail="No tienes acceso a este plan")
     
     
@@ -64,8 +70,8 @@ async def record_nutrition_progress(
         **progress.dict()
     )
     db.add(db_progress)
-    db.commit()
-    db.refresh(db_progress)
+    await db.commit()
+    await db.refresh(db_progress)
     return db_progress
 
 @router.get("/workout/{plan_id}", response_model=List[schemas.WorkoutProgress])
@@ -74,19 +80,20 @@ async def get_workout_progress(
     start_date: date = None,
     end_date: date = None,
     current_user = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_read_db)
 ):
-    query = db.query(models.WorkoutProgress).filter(
+    query = select(models.WorkoutProgress).where(
         models.WorkoutProgress.workout_plan_id == plan_id,
         models.WorkoutProgress.user_id == current_user["user"].id
     )
     
     if start_date:
-        query = query.filter(models.WorkoutProgress.date >= start_date)
+        query = query.where(models.WorkoutProgress.date >= start_date)
     if end_date:
-        query = query.filter(models.WorkoutProgress.date <= end_date)
+        query = query.where(models.WorkoutProgress.date <= end_date)
     
-    return query.order_by(models.WorkoutProgress.date.desc()).all()
+    result = await db.scalars(query.order_by(models.WorkoutProgress.date.desc()))
+    return result.all()
 
 @router.get("/nutrition/{plan_id}", response_model=List[schemas.NutritionProgress])
 async def get_nutrition_progress(
@@ -94,19 +101,20 @@ async def get_nutrition_progress(
     start_date: date = None,
     end_date: date = None,
     current_user = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_read_db)
 ):
-    query = db.query(models.NutritionProgress).filter(
+    query = select(models.NutritionProgress).where(
         models.NutritionProgress.nutrition_plan_id == plan_id,
         models.NutritionProgress.user_id == current_user["user"].id
     )
     
     if start_date:
-        query = query.filter(models.NutritionProgress.date >= start_date)
+        query = query.where(models.NutritionProgress.date >= start_date)
     if end_date:
-        query = query.filter(models.NutritionProgress.date <= end_date)
+        query = query.where(models.NutritionProgress.date <= end_date)
     
-    return query.order_by(models.NutritionProgress.date.desc()).all()
+    result = await db.scalars(query.order_by(models.NutritionProgress.date.desc()))
+    return result.all()
 
 @router.get("/trainer/users/{user_id}/workout", response_model=List[schemas.WorkoutProgress])
 async def get_user_workout_progress(
@@ -115,28 +123,31 @@ async def get_user_workout_progress(
     start_date: date = None,
     end_date: date = None,
     current_user = Depends(get_current_trainer),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_read_db)
 ):
-    user = db.query(models.User).filter(
-        models.User.id == user_id,
-        models.User.trainer_id == current_user["user"].id
-    ).first()
+    user = await db.scalar(
+        select(models.User).where(
+            models.User.id == user_id,
+            models.User.trainer_id == current_user["user"].id
+        )
+    )
     
     if not user:
         raise HTTPException(status_code=404, detail="Usuario no encontrado")
     
-    query = db.query(models.WorkoutProgress).filter(
+    query = select(models.WorkoutProgress).where(
         models.WorkoutProgress.user_id == user_id
     )
     
     if plan_id:
-        query = query.filter(models.WorkoutProgress.workout_plan_id == plan_id)
+        query = query.where(models.WorkoutProgress.workout_plan_id == plan_id)
     if start_date:
-        query = query.filter(models.WorkoutProgress.date >= start_date)
+        query = query.where(models.WorkoutProgress.date >= start_date)
     if end_date:
-        query = query.filter(models.WorkoutProgress.date <= end_date)
+        query = query.where(models.WorkoutProgress.date <= end_date)
     
-    return query.order_by(models.WorkoutProgress.date.desc()).all()
+    result = await db.scalars(query.order_by(models.WorkoutProgress.date.desc()))
+    return result.all()
 
 @router.get("/trainer/users/{user_id}/nutrition", response_model=List[schemas.NutritionProgress])
 async def get_user_nutrition_progress(
@@ -145,25 +156,28 @@ async def get_user_nutrition_progress(
     start_date: date = None,
     end_date: date = None,
     current_user = Depends(get_current_trainer),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_read_db)
 ):
-    user = db.query(models.User).filter(
-        models.User.id == user_id,
-        models.User.trainer_id == current_user["user"].id
-    ).first()
+    user = await db.scalar(
+        select(models.User).where(
+            models.User.id == user_id,
+            models.User.trainer_id == current_user["user"].id
+        )
+    )
     
     if not user:
         raise HTTPException(status_code=404, detail="Usuario no encontrado")
     
-    query = db.query(models.NutritionProgress).filter(
+    query = select(models.NutritionProgress).where(
         models.NutritionProgress.user_id == user_id
     )
     
     if plan_id:
-        query = query.filter(models.NutritionProgress.nutrition_plan_id == plan_id)
+        query = query.where(models.NutritionProgress.nutrition_plan_id == plan_id)
     if start_date:
-        query = query.filter(models.NutritionProgress.date >= start_date)
+        query = query.where(models.NutritionProgress.date >= start_date)
     if end_date:
-        query = query.filter(models.NutritionProgress.date <= end_date)
+        query = query.where(models.NutritionProgress.date <= end_date)
     
-    return query.order_by(models.NutritionProgress.date.desc()).all()
\ No newline at end of file
+    result = await db.scalars(query.order_by(models.NutritionProgress.date.desc()))
+    return result.all()
\ No newline at end of file
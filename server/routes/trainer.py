@@ -1,13 +1,16 @@
-from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy.orm import Session, joinedload
-from sqlalchemy import func, Integer
-from typing import List
+from fastapi import APIRouter, Depends, HTTPException, Query, Response, status
+from sqlalchemy.orm import Session, selectinload
+from sqlalchemy import exists
+from sqlalchemy.exc import IntegrityError
+from typing import List, Optional
 from datetime import date, datetime, timedelta
-from config.database import get_db
+from config.database import get_db, get_read_db
 import models.models as models
 import schemas.schemas as schemas
 from utils.auth import get_current_trainer, get_password_hash
-from utils.metrics import calculate_progress_stats, get_user_completion_rates
+from utils import cohort, dashboard
+from utils.pagination import keyset_list
+from utils.metrics import calculate_progress_stats, get_user_completion_rates, summary_progress_stats
 
 router = APIRouter(prefix="/trainer", tags=["trainer"])
 
@@ -44,15 +47,20 @@ def create_user(
 
 @router.get("/users/", response_model=List[schemas.User])
 def read_users(
+    response: Response,
     skip: int = 0,
-    limit: int = 100,
+    limit: int = Query(100, ge=1),
+    cursor: Optional[str] = None,
+    search: Optional[str] = None,
     current_user = Depends(get_current_trainer),
     db: Session = Depends(get_db)
 ):
-    users = db.query(models.User).filter(
+    query = db.query(models.User).filter(
         models.User.trainer_id == current_user["user"].id
-    ).offset(skip).limit(limit).all()
-    return users
+    )
+    if search:
+        query = query.filter(models.User.email.startswith(search, autoescape=True))
+    return keyset_list(query, [models.User.id], response, cursor, skip, limit)
 
 @router.get("/users/{user_id}", response_model=schemas.User)
 def read_user(
@@ -176,16 +184,20 @@ def get_user_metrics(
 # Workout Plans Management
 @router.get("/workout-plans/", response_model=List[schemas.WorkoutPlan])
 def read_workout_plans(
+    response: Response,
     skip: int = 0,
-    limit: int = 100,
+    limit: int = Query(100, ge=1),
+    cursor: Optional[str] = None,
+    search: Optional[str] = None,
     current_user = Depends(get_current_trainer),
     db: Session = Depends(get_db)
 ):
-    workout_plans = db.query(models.WorkoutPlan).filter(
+    query = db.query(models.WorkoutPlan).filter(
         models.WorkoutPlan.trainer_id == current_user["user"].id
-    ).options(joinedload(models.WorkoutPlan.exercises))\
-    .offset(skip).limit(limit).all()
-    return workout_plans
+    ).options(selectinload(models.WorkoutPlan.exercises))
+    if search:
+        query = query.filter(models.WorkoutPlan.name.startswith(search, autoescape=True))
+    return keyset_list(query, [models.WorkoutPlan.id], response, cursor, skip, limit)
 
 @router.post("/workout-plans/", response_model=schemas.WorkoutPlan)
 def create_workout_plan(
@@ -307,16 +319,20 @@ def create_nutrition_plan(
 
 @router.get("/nutrition-plans/", response_model=List[schemas.NutritionPlan])
 def read_nutrition_plans(
+    response: Response,
     skip: int = 0,
-    limit: int = 100,
+    limit: int = Query(100, ge=1),
+    cursor: Optional[str] = None,
+    search: Optional[str] = None,
     current_user = Depends(get_current_trainer),
     db: Session = Depends(get_db)
 ):
-    plans = db.query(models.NutritionPlan).filter(
+    query = db.query(models.NutritionPlan).filter(
         models.NutritionPlan.trainer_id == current_user["user"].id
-    ).options(joinedload(models.NutritionPlan.meals))\
-    .offset(skip).limit(limit).all()
-    return plans
+    ).options(selectinload(models.NutritionPlan.meals))
+    if search:
+        query = query.filter(models.NutritionPlan.name.startswith(search, autoescape=True))
+    return keyset_list(query, [models.NutritionPlan.id], response, cursor, skip, limit)
 
 @router.get("/nutrition-plans/{plan_id}", response_model=schemas.NutritionPlan)
 def read_nutrition_plan(
@@ -392,7 +408,7 @@ async def get_user_progress(
     start_date: date = None,
     end_date: date = None,
     current_user = Depends(get_current_trainer),
-    db: Session = Depends(get_db)
+    db: Session = Depends(get_read_db)
 ):
     user = db.query(models.User).filter(
         models.User.id == user_id,
@@ -432,66 +448,13 @@ async def get_user_progress(
 
 # Dashboard
 @router.get("/dashboard/stats")
-async def get_trainer_stats(
+def get_trainer_stats(
     current_user = Depends(get_current_trainer),
     db: Session = Depends(get_db)
 ):
-    trainer_id = current_user["user"].id
-    
-    total_users = db.query(models.User).filter(
-        models.User.trainer_id == trainer_id
-    ).count()
-    
-    total_workout_plans = db.query(models.WorkoutPlan).filter(
-        models.WorkoutPlan.trainer_id == trainer_id
-    ).count()
-    
-    total_nutrition_plans = db.query(models.NutritionPlan).filter(
-        models.NutritionPlan.trainer_id == trainer_id
-    ).count()
-    
-    # Estadísticas de los últimos 30 días
-    thirty_days_ago = datetime.utcnow() - timedelta(days=30)
-    
-    # Usuarios activos (que han registrado progreso en los últimos 30 días)
-    active_users = db.query(models.User).join(models.WorkoutProgress).filter(
-        models.User.trainer_id == trainer_id,
-        models.WorkoutProgress.date >= thirty_days_ago
-    ).distinct().count()
-    
-    # Promedio de cumplimiento de planes
-    workout_completion = db.query(
-        models.WorkoutProgress
-    ).join(
-        models.User
-    ).filter(
-        models.User.trainer_id == trainer_id,
-        models.WorkoutProgress.date >= thirty_days_ago
-    ).with_entities(
-        func.avg(models.WorkoutProgress.completed.cast(Integer)) * 100    ).scalar() or 0
-
-    nutrition_completion = db.query(
-        models.NutritionProgress
-    ).join(
-        models.User
-    ).filter(
-        models.User.trainer_id == trainer_id,
-        models.NutritionProgress.date >= thirty_days_ago
-    ).with_entities(
-        func.avg(models.NutritionProgress.completed.cast(Integer)) * 100    ).scalar() or 0
-
-    return {
-        "total_stats": {
-            "users": total_users,
-            "workout_plans": total_workout_plans,
-            "nutrition_plans": total_nutrition_plans,
-            "active_users": active_users
-        },
-        "completion_rates": {
-            "workout": round(workout_completion, 2),
-            "nutrition": round(nutrition_completion, 2)
-        }
-    }
+    # Una sola consulta agregada, cacheada por entrenador durante unos segundos.
+    # Se calcula en el primario: una réplica con retraso quedaría cacheada todo el TTL
+    return dashboard.get_trainer_stats(db, current_user["user"].id)
 
 # Asignación de planes
 @router.post("/assign-workout/{user_id}/{plan_id}")
@@ -517,15 +480,23 @@ async def assign_workout_plan(
     if not plan:
         raise HTTPException(status_code=404, detail="Plan no encontrado")
 
-    # Verificar si ya existe la asignación
-    if plan in user.workout_plans:
+    # Verificar si ya existe la asignación (EXISTS sobre la PK, sin cargar la colección)
+    already_assigned = db.query(exists().where(
+        models.user_workout_plans.c.user_id == user.id,
+        models.user_workout_plans.c.workout_plan_id == plan.id
+    )).scalar()
+    if already_assigned:
         raise HTTPException(status_code=400, detail="El plan ya está asignado a este usuario")
 
-    # Realizar la asignación
-    user.workout_plans.append(plan)
+    # Realizar la asignación escribiendo directamente la fila intermedia
     try:
+        db.execute(models.user_workout_plans.insert().values(user_id=user.id, workout_plan_id=plan.id))
         db.commit()
         return {"message": "Plan asignado exitosamente"}
+    except IntegrityError:
+        # Otra petición concurrente asignó el mismo plan
+        db.rollback()
+        raise HTTPException(status_code=400, detail="El plan ya está asignado a este usuario")
     except Exception as e:
         db.rollback()
         raise HTTPException(status_code=500, detail=str(e))
@@ -553,15 +524,23 @@ async def assign_nutrition_plan(
     if not plan:
         raise HTTPException(status_code=404, detail="Plan no encontrado")
 
-    # Verificar si ya existe la asignación
-    if plan in user.nutrition_plans:
+    # Verificar si ya existe la asignación (EXISTS sobre la PK, sin cargar la colección)
+    already_assigned = db.query(exists().where(
+        models.user_nutrition_plans.c.user_id == user.id,
+        models.user_nutrition_plans.c.nutrition_plan_id == plan.id
+    )).scalar()
+    if already_assigned:
         raise HTTPException(status_code=400, detail="El plan ya está asignado a este usuario")
 
-    # Realizar la asignación
-    user.nutrition_plans.append(plan)
+    # Realizar la asignación escribiendo directamente la fila intermedia
     try:
+        db.execute(models.user_nutrition_plans.insert().values(user_id=user.id, nutrition_plan_id=plan.id))
         db.commit()
         return {"message": "Plan nutricional asignado exitosamente"}
+    except IntegrityError:
+        # Otra petición concurrente asignó el mismo plan
+        db.rollback()
+        raise HTTPException(status_code=400, detail="El plan ya está asignado a este usuario")
     except Exception as e:
         db.rollback()
         raise HTTPException(status_code=500, detail=str(e))
@@ -588,11 +567,16 @@ async def unassign_workout_plan(
         models.WorkoutPlan.id == plan_id,
         models.WorkoutPlan.trainer_id == current_user["user"].id
     ).first()
-    if not plan or plan not in user.workout_plans:
+    if not plan:
         raise HTTPException(status_code=404, detail="Plan no encontrado o no asignado")
 
-    # Remover la asignación
-    user.workout_plans.remove(plan)
+    # Remover la asignación: borrado directo de la fila intermedia
+    result = db.execute(models.user_workout_plans.delete().where(
+        models.user_workout_plans.c.user_id == user.id,
+        models.user_workout_plans.c.workout_plan_id == plan.id
+    ))
+    if result.rowcount == 0:
+        raise HTTPException(status_code=404, detail="Plan no encontrado o no asignado")
     try:
         db.commit()
         return {"message": "Plan removido exitosamente"}
@@ -620,11 +604,16 @@ async def unassign_nutrition_plan(
         models.NutritionPlan.id == plan_id,
         models.NutritionPlan.trainer_id == current_user["user"].id
     ).first()
-    if not plan or plan not in user.nutrition_plans:
+    if not plan:
         raise HTTPException(status_code=404, detail="Plan no encontrado o no asignado")
 
-    # Remover la asignación
-    user.nutrition_plans.remove(plan)
+    # Remover la asignación: borrado directo de la fila intermedia
+    result = db.execute(models.user_nutrition_plans.delete().where(
+        models.user_nutrition_plans.c.user_id == user.id,
+        models.user_nutrition_plans.c.nutrition_plan_id == plan.id
+    ))
+    if result.rowcount == 0:
+        raise HTTPException(status_code=404, detail="Plan no encontrado o no asignado")
     try:
         db.commit()
         return {"message": "Plan nutricional removido exitosamente"}
@@ -632,11 +621,24 @@ async def unassign_nutrition_plan(
         db.rollback()
         raise HTTPException(status_code=500, detail=str(e))
 
+def _period_range(period: str):
+    """(start, end) of a stats period ending now; "all" has no bounds"""
+    end_date = datetime.utcnow()
+    if period == "week":
+        return end_date - timedelta(days=7), end_date
+    if period == "month":
+        return end_date - timedelta(days=30), end_date
+    if period == "year":
+        return end_date - timedelta(days=365), end_date
+    if period == "all":
+        return None, None
+    raise HTTPException(status_code=400, detail="Período inválido")
+
 @router.get("/user-stats/{user_id}")
 async def get_user_statistics(
     user_id: int,
-    period: str = "month",  # "week", "month", "year"
-    db: Session = Depends(get_db),
+    period: str = "month",  # "week", "month", "year", "all"
+    db: Session = Depends(get_read_db),
     current_user = Depends(get_current_trainer)
 ):
     # Verificar si el usuario existe y pertenece al entrenador
@@ -648,25 +650,19 @@ async def get_user_statistics(
         raise HTTPException(status_code=404, detail="Usuario no encontrado")
 
     # Determinar el rango de fechas
-    end_date = datetime.utcnow()
-    if period == "week":
-        start_date = end_date - timedelta(days=7)
-    elif period == "month":
-        start_date = end_date - timedelta(days=30)
-    elif period == "year":
-        start_date = end_date - timedelta(days=365)
-    else:
-        raise HTTPException(status_code=400, detail="Período inválido")
-
-    # Obtener métricas
-    metrics = db.query(models.UserMetrics).filter(
-        models.UserMetrics.user_id == user_id,
-        models.UserMetrics.date.between(start_date, end_date)
-    ).all()
+    start_date, end_date = _period_range(period)
 
     # Calcular estadísticas
     completion_rates = get_user_completion_rates(db, user_id, start_date, end_date)
-    progress_stats = calculate_progress_stats(metrics) if metrics else None
+    if period == "all":
+        # Todo el historial: una sola fila de resumen en lugar de todas las métricas
+        progress_stats = summary_progress_stats(db.get(models.UserProgressSummary, user_id))
+    else:
+        metrics = db.query(models.UserMetrics).filter(
+            models.UserMetrics.user_id == user_id,
+            models.UserMetrics.date.between(start_date, end_date)
+        ).order_by(models.UserMetrics.date).all()
+        progress_stats = calculate_progress_stats(metrics) if metrics else None
 
     return {
         "period": period,
@@ -678,6 +674,52 @@ async def get_user_statistics(
         "total_nutrition_plans": len(user.nutrition_plans)
     }
 
+@router.get("/cohort")
+def get_cohort(
+    period: str = "month",  # "week", "month", "year", "all"
+    sort_by: str = "user_id",
+    order: str = "asc",  # "asc", "desc"
+    min_workout_rate: Optional[float] = None,
+    max_workout_rate: Optional[float] = None,
+    min_nutrition_rate: Optional[float] = None,
+    max_nutrition_rate: Optional[float] = None,
+    min_weight_change: Optional[float] = None,
+    max_weight_change: Optional[float] = None,
+    active: Optional[bool] = None,
+    db: Session = Depends(get_read_db),
+    current_user = Depends(get_current_trainer)
+):
+    """
+    Estadísticas de todos los clientes del entrenador, con orden y filtros por columna
+    """
+    if sort_by not in cohort.SORTABLE_COLUMNS:
+        raise HTTPException(status_code=400, detail="Columna de orden inválida")
+    if order not in ("asc", "desc"):
+        raise HTTPException(status_code=400, detail="Orden inválido")
+    start_date, end_date = _period_range(period)
+
+    # Unas pocas consultas agrupadas para toda la cartera, en lugar de una tanda por usuario
+    columns = cohort.compute_cohort(db, current_user["user"].id, start_date, end_date)
+    rows = cohort.select_cohort(
+        columns,
+        {
+            "workout_rate": (min_workout_rate, max_workout_rate),
+            "nutrition_rate": (min_nutrition_rate, max_nutrition_rate),
+            "weight_change": (min_weight_change, max_weight_change),
+        },
+        active=active,
+        sort_by=sort_by,
+        descending=order == "desc"
+    )
+    return {
+        "period": period,
+        "start_date": start_date,
+        "end_date": end_date,
+        "total": len(columns["user_id"]),
+        "count": len(rows),
+        "users": cohort.cohort_rows(columns, rows)
+    }
+
 @router.get("/user/goals/{user_id}", response_model=schemas.UserGoals)
 async def get_goals_by_user_id(
     user_id: int,
@@ -1,10 +1,15 @@
-from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy.orm import Session
+from fastapi import APIRouter, Depends, HTTPException, Query, status
+from sqlalchemy import case, func, select
+from sqlalchemy.orm import Session, selectinload
+from typing import Optional
+from datetime import date, datetime, time, timedelta
 
-from config.database import get_db
+from config.database import get_db, get_read_db
 import models.models as models
 import schemas.schemas as schemas
+from utils import analytics
 from utils.auth import get_current_user
+from utils.pagination import MAX_PAGE_SIZE, decode_cursor, decode_keys, encode_cursor, invalid_cursor, paginate, split_page
 
 router = APIRouter(prefix="/user", tags=["user"])
 
@@ -43,7 +48,11 @@ async def get_user_plans(
     if current_user["role"] != "user":
         raise HTTPException(status_code=403, detail="Only users can access their plans")
     
-    user = db.query(models.User).filter(models.User.id == current_user["user"].id).first()
+    # Carga selectin: 5 consultas fijas en lugar de una por plan para ejercicios y comidas
+    user = db.query(models.User).options(
+        selectinload(models.User.workout_plans).selectinload(models.WorkoutPlan.exercises),
+        selectinload(models.User.nutrition_plans).selectinload(models.NutritionPlan.meals)
+    ).filter(models.User.id == current_user["user"].id).first()
     
     return {
         "workout_plans": [
@@ -76,51 +85,165 @@ async def get_user_plans(
         ]
     }
 
+# Flujos de /user/progress/: cada uno se pagina por separado con su propio cursor
+PROGRESS_STREAMS = {
+    "workout_progress": (models.WorkoutProgress, schemas.WorkoutProgress),
+    "nutrition_progress": (models.NutritionProgress, schemas.NutritionProgress),
+    "metrics": (models.UserMetrics, schemas.UserMetrics),
+}
+DEFAULT_PROGRESS_WINDOW_DAYS = 90
+
 @router.get("/progress/", response_model=dict)
-async def get_user_progress(
+def get_user_progress(
+    start_date: date = None,
+    end_date: date = None,
+    limit: int = Query(50, ge=1, le=MAX_PAGE_SIZE),
+    cursor: Optional[str] = None,
     current_user = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: Session = Depends(get_read_db)
 ):
     if current_user["role"] != "user":
         raise HTTPException(status_code=403, detail="Only users can access their progress")
     
-    user = db.query(models.User).filter(models.User.id == current_user["user"].id).first()
+    # Con cursor solo se devuelve la siguiente página de su flujo, con la misma ventana de fechas
+    if cursor:
+        payload = decode_cursor(cursor)
+        stream = payload.get("stream")
+        if stream not in PROGRESS_STREAMS:
+            raise invalid_cursor()
+        try:
+            start_date = date.fromisoformat(payload["start_date"])
+            end_date = date.fromisoformat(payload["end_date"])
+        except (KeyError, TypeError, ValueError):
+            raise invalid_cursor()
+        streams = [stream]
+    else:
+        end_date = end_date or date.today()
+        start_date = start_date or end_date - timedelta(days=DEFAULT_PROGRESS_WINDOW_DAYS)
+        streams = list(PROGRESS_STREAMS)
+    
+    window_start = datetime.combine(start_date, time.min)
+    window_end = datetime.combine(end_date + timedelta(days=1), time.min)
     
+    response = {"start_date": start_date, "end_date": end_date, "next_cursor": {}}
+    for stream in streams:
+        model, schema = PROGRESS_STREAMS[stream]
+        keys = [model.date, model.id]
+        after = decode_keys(keys, payload.get("after")) if cursor else None
+        query = select(model).where(
+            model.user_id == current_user["user"].id,
+            model.date >= window_start,
+            model.date < window_end
+        )
+        rows = db.scalars(paginate(query, keys, after, limit)).all()
+        rows, last_key = split_page(rows, keys, limit)
+        
+        response[stream] = [schema.model_validate(row) for row in rows]
+        response["next_cursor"][stream] = encode_cursor({
+            "stream": stream,
+            "start_date": start_date,
+            "end_date": end_date,
+            "after": last_key
+        }) if last_key else None
+    
+    return response
+
+# Ventanas de /user/progress/stats terminadas en end_date (incluido)
+STATS_RANGES = {"week": 7, "month": 30, "year": 365}
+MAX_STATS_WINDOW_DAYS = 366
+
+def _completion_stats(db: Session, model, plan_column, user_id: int, window_start, window_end) -> dict:
+    # Un GROUP BY por plan resuelto con el índice (user_id, plan, date)
+    rows = db.execute(
+        select(
+            plan_column,
+            func.count(model.id),
+            func.coalesce(func.sum(case((model.completed == True, 1), else_=0)), 0)
+        ).where(
+            model.user_id == user_id,
+            model.date >= window_start,
+            model.date < window_end
+        ).group_by(plan_column)
+    ).all()
+    total = sum(row[1] for row in rows)
+    completed = sum(row[2] for row in rows)
     return {
-        "workout_progress": user.workout_progress,
-        "nutrition_progress": user.nutrition_progress,
-        "metrics": user.metrics
+        "total": total,
+        "completed": completed,
+        "adherence_rate": completed / total if total else 0,
+        "by_plan": [
+            {"plan_id": plan_id, "total": count, "completed": done, "adherence_rate": done / count}
+            for plan_id, count, done in rows
+        ]
     }
 
 @router.get("/progress/stats")
-async def get_user_progress_stats(
-    range: str,
+def get_user_progress_stats(
+    range: str = "month",  # "week", "month", "year", "custom"
+    start_date: date = None,
+    end_date: date = None,
+    max_points: Optional[int] = Query(None, ge=3, le=MAX_STATS_WINDOW_DAYS),
     current_user = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: Session = Depends(get_read_db)
 ):
     if current_user["role"] != "user":
         raise HTTPException(status_code=403, detail="Only users can access their stats")
     
-    user = db.query(models.User).filter(models.User.id == current_user["user"].id).first()
+    end_date = end_date or date.today()
+    if range in STATS_RANGES:
+        start_date = end_date - timedelta(days=STATS_RANGES[range] - 1)
+    elif range == "custom":
+        if not start_date or start_date > end_date:
+            raise HTTPException(status_code=400, detail="Custom range requires start_date <= end_date")
+        if (end_date - start_date).days >= MAX_STATS_WINDOW_DAYS:
+            raise HTTPException(status_code=400, detail=f"Custom range cannot exceed {MAX_STATS_WINDOW_DAYS} days")
+    else:
+        raise HTTPException(status_code=400, detail="Invalid range parameter")
     
-    # Get stats based on range (month in this case)
-    if range == "month":
-        return {
-            "workout_stats": {
-                "completed_workouts": len([wp for wp in user.workout_progress if wp.completed]),
-                "total_workouts": len(user.workout_progress)
-            },
-            "nutrition_stats": {
-                "adherence_rate": len([np for np in user.nutrition_progress if np.completed]) / len(user.nutrition_progress) if user.nutrition_progress else 0
-            },
-            "metrics_progress": {
-                "weight": [metric.weight for metric in user.metrics],
-                "body_fat": [metric.body_fat for metric in user.metrics],
-                "muscle_mass": [metric.muscle_mass for metric in user.metrics]
-            }
-        }
+    user_id = current_user["user"].id
+    window_start = datetime.combine(start_date, time.min)
+    window_end = datetime.combine(end_date + timedelta(days=1), time.min)
+    
+    # Serie de métricas agregada por día: como máximo un punto por día de la ventana
+    day = func.date(models.UserMetrics.date)
+    metrics = db.execute(
+        select(
+            day.label("day"),
+            func.avg(models.UserMetrics.weight),
+            func.avg(models.UserMetrics.body_fat),
+            func.avg(models.UserMetrics.muscle_mass)
+        ).where(
+            models.UserMetrics.user_id == user_id,
+            models.UserMetrics.date >= window_start,
+            models.UserMetrics.date < window_end
+        ).group_by(day).order_by(day)
+    ).all()
+    if max_points and len(metrics) > max_points:
+        keep = analytics.downsample(analytics.to_arrays(metrics), max_points)
+        metrics = [metrics[index] for index in keep]
     
-    raise HTTPException(status_code=400, detail="Invalid range parameter")
+    workout_stats = _completion_stats(
+        db, models.WorkoutProgress, models.WorkoutProgress.workout_plan_id, user_id, window_start, window_end
+    )
+    # Claves anteriores de workout_stats, que siguen leyendo los clientes existentes
+    workout_stats["completed_workouts"] = workout_stats["completed"]
+    workout_stats["total_workouts"] = workout_stats["total"]
+    
+    return {
+        "range": range,
+        "start_date": start_date,
+        "end_date": end_date,
+        "workout_stats": workout_stats,
+        "nutrition_stats": _completion_stats(
+            db, models.NutritionProgress, models.NutritionProgress.nutrition_plan_id, user_id, window_start, window_end
+        ),
+        "metrics_progress": {
+            "dates": [str(row[0]) for row in metrics],
+            "weight": [row[1] for row in metrics],
+            "body_fat": [row[2] for row in metrics],
+            "muscle_mass": [row[3] for row in metrics]
+        }
+    }
 
 @router.get("/goals/")
 async def get_user_goals(
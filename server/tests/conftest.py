@@ -0,0 +1,12 @@
+import os
+import sys
+import tempfile
+
+# Base de datos SQLite temporal: los tests nunca tocan la configurada en .env
+_db_dir = tempfile.mkdtemp(prefix="fitness-tests-")
+os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(_db_dir, 'test.db')}"
+os.environ["ASYNC_DATABASE_URL"] = f"sqlite+aiosqlite:///{os.path.join(_db_dir, 'test.db')}"
+os.environ["DATABASE_REPLICA_URLS"] = ""
+os.environ.setdefault("SECRET_KEY", "test-secret")
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
@@ -0,0 +1,39 @@
+"""Chart downsampling keeps the first and last samples and fills the requested budget."""
+import numpy as np
+import pytest
+
+from utils.analytics import METRIC_FIELDS, downsample
+
+ROWS = 400
+
+
+def _series(rows: int = ROWS) -> dict:
+    rng = np.random.default_rng(7)
+    dates = np.datetime64("2025-01-01T00:00:00") + np.arange(rows) * np.timedelta64(86400, "s")
+    series = {"dates": dates}
+    for offset, field in enumerate(METRIC_FIELDS):
+        series[field] = 30.0 * (offset + 1) + rng.normal(size=rows).cumsum()
+    return series
+
+
+@pytest.mark.parametrize("max_points", [3, 4, 5, 6, 7, 8, 9, 50, 300])
+def test_downsample_fills_budget_with_endpoints(max_points):
+    keep = downsample(_series(), max_points)
+    assert len(keep) == max_points
+    assert keep[0] == 0 and keep[-1] == ROWS - 1
+    assert (np.diff(keep) > 0).all()
+
+
+def test_downsample_with_sparse_metrics_keeps_latest_sample():
+    series = _series()
+    # Solo una métrica con datos y únicamente en la parte final de la serie
+    series["weight"][:300] = np.nan
+    series["body_fat"][:] = np.nan
+    series["muscle_mass"][:] = np.nan
+    keep = downsample(series, 3)
+    assert len(keep) == 3
+    assert keep[-1] == ROWS - 1
+
+
+def test_downsample_returns_everything_under_budget():
+    assert downsample(_series(10), 20).tolist() == list(range(10))
@@ -0,0 +1,92 @@
+"""The plan endpoints load plan trees in a fixed number of statements, however many plans a user has."""
+from contextlib import contextmanager
+
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy import event
+
+import config.database as database
+import models.models as models
+from main import app
+from utils.auth import get_password_hash
+
+# Consulta del usuario más dos cargas selectin por tipo de plan (planes y sus ejercicios/comidas)
+PLAN_TREE_QUERIES = 5
+
+
+@pytest.fixture(scope="module")
+def client():
+    models.Base.metadata.create_all(bind=database.engine)
+    with TestClient(app) as client:
+        yield client
+    models.Base.metadata.drop_all(bind=database.engine)
+
+
+def _seed(email: str, plans: int) -> int:
+    db = database.SessionLocal()
+    try:
+        user = models.User(email=email, hashed_password=get_password_hash("pw"), full_name=email)
+        for index in range(plans):
+            workout = models.WorkoutPlan(name=f"workout {index}")
+            workout.exercises = [models.Exercise(name=f"exercise {n}", sets=3, reps=10) for n in range(3)]
+            nutrition = models.NutritionPlan(name=f"nutrition {index}")
+            nutrition.meals = [models.Meal(name=f"meal {n}", calories=500) for n in range(3)]
+            user.workout_plans.append(workout)
+            user.nutrition_plans.append(nutrition)
+        db.add(user)
+        db.commit()
+        return user.id
+    finally:
+        db.close()
+
+
+def _headers(client, email: str) -> dict:
+    response = client.post("/token", data={"username": email, "password": "pw"})
+    assert response.status_code == 200, response.text
+    return {"Authorization": f"Bearer {response.json()['access_token']}"}
+
+
+@contextmanager
+def count_statements():
+    statements = []
+
+    def _count(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    event.listen(database.engine, "before_cursor_execute", _count)
+    try:
+        yield statements
+    finally:
+        event.remove(database.engine, "before_cursor_execute", _count)
+
+
+def _statements_for(client, url: str, headers: dict, expected_plans: int) -> int:
+    client.get(url, headers=headers)  # calienta la caché de principales: solo cuentan las consultas de la ruta
+    with count_statements() as statements:
+        response = client.get(url, headers=headers)
+    assert response.status_code == 200, response.text
+    body = response.json()
+    assert len(body["workout_plans"]) == expected_plans
+    assert len(body["nutrition_plans"]) == expected_plans
+    return len(statements)
+
+
+@pytest.mark.parametrize("plans", [1, 10])
+def test_user_plans_query_count_is_constant(client, plans):
+    email = f"user{plans}@test.local"
+    _seed(email, plans)
+    assert _statements_for(client, "/user/plans/", _headers(client, email), plans) == PLAN_TREE_QUERIES
+
+
+@pytest.mark.parametrize("plans", [1, 10])
+def test_admin_user_plans_query_count_is_constant(client, plans):
+    db = database.SessionLocal()
+    try:
+        admin = models.Admin(email=f"admin{plans}@test.local", hashed_password=get_password_hash("pw"))
+        db.add(admin)
+        db.commit()
+    finally:
+        db.close()
+    user_id = _seed(f"client{plans}@test.local", plans)
+    url = f"/admin/users/{user_id}/plans"
+    assert _statements_for(client, url, _headers(client, f"admin{plans}@test.local"), plans) == PLAN_TREE_QUERIES
@@ -0,0 +1,179 @@
+from datetime import date, datetime, time, timedelta
+from typing import Optional
+import numpy as np
+from sqlalchemy import select
+import models.models as models
+
+METRIC_FIELDS = ("weight", "body_fat", "muscle_mass")
+SECONDS_PER_DAY = 86400.0
+
+
+def metric_series_query(user_id: int, start_date: Optional[date] = None, end_date: Optional[date] = None):
+    """Select the user's metric series ordered by date, as plain columns"""
+    query = select(
+        models.UserMetrics.date,
+        *(getattr(models.UserMetrics, field) for field in METRIC_FIELDS)
+    ).where(models.UserMetrics.user_id == user_id)
+    if start_date:
+        query = query.where(models.UserMetrics.date >= datetime.combine(start_date, time.min))
+    if end_date:
+        query = query.where(models.UserMetrics.date < datetime.combine(end_date + timedelta(days=1), time.min))
+    return query.order_by(models.UserMetrics.date)
+
+
+def to_arrays(rows) -> dict:
+    """Turn (date, weight, body_fat, muscle_mass) rows into a datetime64 array and float arrays"""
+    columns = list(zip(*rows)) if rows else [()] * (len(METRIC_FIELDS) + 1)
+    series = {"dates": np.array(columns[0], dtype="datetime64[s]")}
+    for field, values in zip(METRIC_FIELDS, columns[1:]):
+        # None -> NaN: cada métrica se analiza solo con sus valores presentes
+        series[field] = np.array(values, dtype=float)
+    return series
+
+
+def moving_average(days: np.ndarray, values: np.ndarray, window_days: float) -> np.ndarray:
+    """Trailing time-window mean at each sample, ignoring NaN, via prefix sums"""
+    present = ~np.isnan(values)
+    sums = np.concatenate(([0.0], np.cumsum(np.where(present, values, 0.0))))
+    counts = np.concatenate(([0], np.cumsum(present)))
+    # Primer índice dentro de la ventana (t - window, t] de cada muestra
+    starts = np.searchsorted(days, days - window_days, side="right")
+    ends = np.arange(1, len(days) + 1)
+    window_counts = counts[ends] - counts[starts]
+    with np.errstate(invalid="ignore", divide="ignore"):
+        averages = (sums[ends] - sums[starts]) / window_counts
+    return np.where(window_counts > 0, averages, np.nan)
+
+
+def weekly_change(days: np.ndarray, values: np.ndarray) -> dict:
+    """Mean per 7-day bucket from the first sample and the change between consecutive buckets"""
+    present = ~np.isnan(values)
+    if not present.any():
+        return {"week_index": np.array([], dtype=np.int64), "mean": np.array([]), "change": np.array([])}
+    buckets = ((days - days[0]) // 7).astype(np.int64)
+    sums = np.bincount(buckets[present], weights=values[present])
+    counts = np.bincount(buckets[present])
+    weeks = np.nonzero(counts)[0]
+    means = sums[weeks] / counts[weeks]
+    change = np.concatenate(([np.nan], np.diff(means)))
+    return {"week_index": weeks, "mean": means, "change": change}
+
+
+def linear_trend(days: np.ndarray, values: np.ndarray) -> dict:
+    """Least-squares slope (per day) and R² over the present samples"""
+    present = ~np.isnan(values)
+    x, y = days[present], values[present]
+    if len(x) < 2 or np.ptp(x) == 0:
+        return {"slope_per_day": None, "intercept": None, "r2": None}
+    x_mean, y_mean = x.mean(), y.mean()
+    dx, dy = x - x_mean, y - y_mean
+    slope = (dx @ dy) / (dx @ dx)
+    residuals = dy - slope * dx
+    total = dy @ dy
+    return {
+        "slope_per_day": float(slope),
+        "intercept": float(y_mean - slope * x_mean),
+        "r2": float(1 - (residuals @ residuals) / total) if total else 1.0
+    }
+
+
+def lttb(x: np.ndarray, y: np.ndarray, max_points: int) -> np.ndarray:
+    """Indices of at most max_points samples kept by Largest-Triangle-Three-Buckets"""
+    n = len(x)
+    if n <= max_points:
+        return np.arange(n)
+    if max_points < 3:
+        return np.array([0, n - 1][:max_points], dtype=np.int64)
+
+    # El primer y el último punto se conservan; el resto se reparte en max_points - 2 cubetas
+    edges = np.linspace(1, n - 1, max_points - 1).astype(np.int64)
+    counts = np.diff(edges)
+    # Centroide de cada cubeta en bloque; el de la siguiente a la última es el punto final
+    next_x = np.append((np.add.reduceat(x[:n - 1], edges[:-1]) / counts)[1:], x[-1])
+    next_y = np.append((np.add.reduceat(y[:n - 1], edges[:-1]) / counts)[1:], y[-1])
+
+    selected = np.empty(max_points, dtype=np.int64)
+    selected[0], selected[-1] = 0, n - 1
+    anchor = 0
+    # Cada cubeta depende del punto elegido en la anterior; dentro de ella el área es vectorial
+    for bucket in range(max_points - 2):
+        start, end = edges[bucket], edges[bucket + 1]
+        areas = np.abs(
+            (x[anchor] - next_x[bucket]) * (y[start:end] - y[anchor])
+            - (x[anchor] - x[start:end]) * (next_y[bucket] - y[anchor])
+        )
+        anchor = start + int(np.argmax(areas))
+        selected[bucket + 1] = anchor
+    return selected
+
+
+def downsample(series: dict, max_points: int) -> np.ndarray:
+    """Sorted sample indices keeping each metric's shape, at most max_points in total"""
+    dates = series["dates"]
+    if len(dates) <= max_points:
+        return np.arange(len(dates))
+    days = (dates - dates[0]).astype("timedelta64[s]").astype(float) / SECONDS_PER_DAY
+    present = {field: np.nonzero(~np.isnan(series[field]))[0] for field in METRIC_FIELDS}
+    present = {field: rows for field, rows in present.items() if rows.size}
+    if not present:
+        return lttb(days, np.zeros(len(days)), max_points)
+
+    # El primer y el último punto siempre; el presupuesto se reparte entre las métricas con datos
+    keep = np.array([0, len(dates) - 1])[:max_points]
+    budget = max(3, max_points // len(present))
+    longest = max(rows.size for rows in present.values())
+    while True:
+        picked = [rows[lttb(days[rows], series[field][rows], budget)] for field, rows in present.items()]
+        candidate = np.union1d(keep, np.concatenate(picked))
+        if candidate.size >= max_points or budget >= longest:
+            break
+        # Las métricas comparten fechas: se amplía el presupuesto hasta llenar max_points
+        keep = candidate
+        budget += -(-(max_points - candidate.size) // len(present))
+    # Del último reparto solo caben algunos puntos: se toman espaciados entre los nuevos
+    extra = np.setdiff1d(candidate, keep)
+    room = max_points - keep.size
+    if extra.size > room:
+        extra = extra[np.linspace(0, extra.size - 1, room).astype(np.int64)] if room > 0 else extra[:0]
+    return np.union1d(keep, extra)
+
+
+def _clean(array: np.ndarray, decimals: int = 3) -> list:
+    # NaN no es JSON válido: se devuelve como null
+    rounded = np.round(array.astype(float), decimals)
+    return np.where(np.isnan(rounded), None, rounded).tolist()
+
+
+def analyze_series(series: dict, window_days: float = 7, include_series: bool = True) -> dict:
+    """Moving average, weekly rate of change, trend slope and variance for each body metric"""
+    dates = series["dates"]
+    days = (dates - dates[0]).astype("timedelta64[s]").astype(float) / SECONDS_PER_DAY if len(dates) else np.array([])
+    first_day = dates[0].astype("datetime64[D]") if len(dates) else None
+    result = {"count": int(len(dates)), "window_days": window_days, "metrics": {}}
+    if include_series:
+        result["dates"] = [str(value) for value in dates.astype("datetime64[D]")]
+
+    for field in METRIC_FIELDS:
+        values = series[field]
+        present = values[~np.isnan(values)]
+        trend = linear_trend(days, values)
+        weekly = weekly_change(days, values)
+        stats = {
+            "count": int(present.size),
+            "latest": float(present[-1]) if present.size else None,
+            "mean": float(present.mean()) if present.size else None,
+            "variance": float(present.var(ddof=1)) if present.size > 1 else None,
+            "std": float(present.std(ddof=1)) if present.size > 1 else None,
+            "trend_per_week": round(trend["slope_per_day"] * 7, 4) if trend["slope_per_day"] is not None else None,
+            "r2": round(trend["r2"], 4) if trend["r2"] is not None else None,
+            "avg_weekly_change": float(np.nanmean(weekly["change"][1:])) if len(weekly["change"]) > 1 else None,
+        }
+        if include_series:
+            stats["moving_average"] = _clean(moving_average(days, values, window_days))
+            stats["weekly"] = {
+                "week_start": [str(value) for value in first_day + weekly["week_index"] * 7],
+                "mean": _clean(weekly["mean"]),
+                "change": _clean(weekly["change"])
+            }
+        result["metrics"][field] = stats
+    return result
@@ -1,19 +1,34 @@
 # utils/auth.py
+import asyncio
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta
 from typing import Optional
 from jose import JWTError, jwt
 from passlib.context import CryptContext
-from fastapi import Depends, HTTPException, status
+from fastapi import Depends, HTTPException, Request, status
 from fastapi.security import OAuth2PasswordBearer
-from sqlalchemy.orm import Session
+from sqlalchemy import event, inspect, update
+from sqlalchemy.orm import Session, make_transient_to_detached, object_session
 from config.database import get_db
 import os
 
 from models import models
+from utils.cache import TTLCache
+from utils.identity import ROLE_MODELS, get_account_model
 
 SECRET_KEY = os.getenv("SECRET_KEY")
 ALGORITHM = "HS256"
 ACCESS_TOKEN_EXPIRE_MINUTES = 30
+REFRESH_TOKEN_EXPIRE_DAYS = int(os.getenv("REFRESH_TOKEN_EXPIRE_DAYS", "7"))
+
+# Caché de principales resueltos, indexada por (rol, email)
+principal_cache = TTLCache(
+    max_size=int(os.getenv("PRINCIPAL_CACHE_MAX_SIZE", "10000")),
+    ttl=float(os.getenv("PRINCIPAL_CACHE_TTL_SECONDS", "60"))
+)
 
 pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="token")
@@ -24,6 +39,64 @@ def verify_password(plain_password, hashed_password):
 def get_password_hash(password):
     return pwd_context.hash(password)
 
+class PasswordHasherPool:
+    """Runs bcrypt work on a dedicated thread pool so it never blocks the event loop"""
+
+    def __init__(self, max_workers: int):
+        # bcrypt libera el GIL, así que los hilos escalan con los núcleos disponibles
+        self.max_workers = max_workers
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="password-hash")
+        self._lock = threading.Lock()
+        self.queued = 0
+        self.in_flight = 0
+        self.max_queued = 0
+        self.completed = 0
+        self.total_wait = 0.0
+        self.total_run = 0.0
+
+    def _run(self, submitted_at: float, fn, *args):
+        started_at = time.perf_counter()
+        with self._lock:
+            self.queued -= 1
+            self.in_flight += 1
+            self.total_wait += started_at - submitted_at
+        try:
+            return fn(*args)
+        finally:
+            with self._lock:
+                self.in_flight -= 1
+                self.completed += 1
+                self.total_run += time.perf_counter() - started_at
+
+    async def run(self, fn, *args):
+        with self._lock:
+            self.queued += 1
+            self.max_queued = max(self.max_queued, self.queued)
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._executor, self._run, time.perf_counter(), fn, *args)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "workers": self.max_workers,
+                "queued": self.queued,
+                "in_flight": self.in_flight,
+                "max_queued": self.max_queued,
+                "completed": self.completed,
+                "avg_wait_ms": round(self.total_wait / self.completed * 1000, 2) if self.completed else 0,
+                "avg_run_ms": round(self.total_run / self.completed * 1000, 2) if self.completed else 0
+            }
+
+password_hasher = PasswordHasherPool(
+    max_workers=int(os.getenv("PASSWORD_HASH_WORKERS", str(os.cpu_count() or 1)))
+)
+
+async def verify_password_async(plain_password, hashed_password):
+    return await password_hasher.run(verify_password, plain_password, hashed_password)
+
+async def get_password_hash_async(password):
+    return await password_hasher.run(get_password_hash, password)
+
 def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
     to_encode = data.copy()
     if expires_delta:
@@ -34,7 +107,87 @@ def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
     encoded_jwt = jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
     return encoded_jwt
 
-async def get_current_user(
+def create_refresh_token(db: Session, email: str, role: str, family_id: Optional[str] = None) -> str:
+    """Issue a refresh token and record it in the server-side store (the caller commits)"""
+    jti = uuid.uuid4().hex
+    expire = datetime.utcnow() + timedelta(days=REFRESH_TOKEN_EXPIRE_DAYS)
+    db.add(models.RefreshToken(
+        jti=jti,
+        family_id=family_id or jti,
+        email=email,
+        role=role,
+        expires_at=expire
+    ))
+    return jwt.encode(
+        {"sub": email, "role": role, "type": "refresh", "jti": jti, "exp": expire},
+        SECRET_KEY,
+        algorithm=ALGORITHM
+    )
+
+def _invalid_refresh_token() -> HTTPException:
+    return HTTPException(
+        status_code=status.HTTP_401_UNAUTHORIZED,
+        detail="Invalid refresh token",
+        headers={"WWW-Authenticate": "Bearer"},
+    )
+
+def _reject_reused_token(db: Session, record: models.RefreshToken) -> HTTPException:
+    # Reutilizar un token ya rotado indica robo: se revoca toda la familia
+    revoke_refresh_family(db, record.family_id)
+    db.commit()
+    return _invalid_refresh_token()
+
+def _decode_refresh_token(db: Session, token: str) -> models.RefreshToken:
+    try:
+        payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
+    except JWTError:
+        raise _invalid_refresh_token()
+    if payload.get("type") != "refresh" or not payload.get("jti"):
+        raise _invalid_refresh_token()
+
+    record = db.query(models.RefreshToken).filter(models.RefreshToken.jti == payload["jti"]).first()
+    if record is None or record.expires_at <= datetime.utcnow():
+        raise _invalid_refresh_token()
+    if record.revoked_at is not None:
+        raise _reject_reused_token(db, record)
+    return record
+
+def rotate_refresh_token(db: Session, token: str) -> models.RefreshToken:
+    """Validate a refresh token, revoke it and return its record; no password hashing involved"""
+    record = _decode_refresh_token(db, token)
+    # Revocación condicional en una sola sentencia: de dos rotaciones concurrentes solo una gana
+    revoked = db.query(models.RefreshToken).filter(
+        models.RefreshToken.jti == record.jti,
+        models.RefreshToken.revoked_at.is_(None)
+    ).update({models.RefreshToken.revoked_at: datetime.utcnow()}, synchronize_session="evaluate")
+    if revoked != 1:
+        raise _reject_reused_token(db, record)
+    return record
+
+def revoke_refresh_family(db: Session, family_id: str) -> None:
+    db.query(models.RefreshToken).filter(
+        models.RefreshToken.family_id == family_id,
+        models.RefreshToken.revoked_at.is_(None)
+    ).update({models.RefreshToken.revoked_at: datetime.utcnow()}, synchronize_session=False)
+
+def _revoke_account_refresh_tokens(connection, role: str, emails) -> None:
+    connection.execute(
+        update(models.RefreshToken.__table__)
+        .where(
+            models.RefreshToken.role == role,
+            models.RefreshToken.email.in_(emails),
+            models.RefreshToken.revoked_at.is_(None)
+        )
+        .values(revoked_at=datetime.utcnow())
+    )
+
+def revoke_refresh_token(db: Session, token: str) -> None:
+    record = _decode_refresh_token(db, token)
+    revoke_refresh_family(db, record.family_id)
+    db.commit()
+
+def get_current_user(
+    request: Request,
     token: str = Depends(oauth2_scheme),
     db: Session = Depends(get_db)
 ):
@@ -47,22 +200,75 @@ async def get_current_user(
         payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
         email: str = payload.get("sub")
         role: str = payload.get("role")
-        if email is None:
+        if email is None or payload.get("type") == "refresh":
             raise credentials_exception
     except JWTError:
         raise credentials_exception
     
-    if role == "admin":
-        user = db.query(models.Admin).filter(models.Admin.email == email).first()
-    elif role == "trainer":
-        user = db.query(models.Trainer).filter(models.Trainer.email == email).first()
+    model = get_account_model(role)
+    snapshot = principal_cache.get((role, email))
+    if snapshot is not None:
+        user = _attach_principal(db, model, snapshot)
     else:
-        user = db.query(models.User).filter(models.User.email == email).first()
+        user = db.query(model).filter(model.email == email).first()
+        if user is not None:
+            principal_cache.set((role, email), _snapshot_principal(user))
     
     if user is None:
         raise credentials_exception
+    # Permite enrutar al primario las lecturas que siguen a una escritura de este usuario
+    request.state.principal = (role, email)
     return {"user": user, "role": role, "email": email}
 
+def _snapshot_principal(user) -> dict:
+    """Copy the column values of a loaded account so it can outlive its session"""
+    return {attr.key: getattr(user, attr.key) for attr in inspect(user).mapper.column_attrs}
+
+def _attach_principal(db: Session, model, snapshot: dict):
+    """Rebuild a cached account inside the request session without querying it"""
+    user = model(**snapshot)
+    make_transient_to_detached(user)
+    # merge(load=False) reutiliza la instancia si ya está en la sesión y permite lazy loads
+    return db.merge(user, load=False)
+
+def invalidate_principal(role: str, email: str) -> None:
+    principal_cache.invalidate((role, email))
+    if role == "user":
+        # Los tokens sin rol se resuelven contra la tabla de usuarios
+        principal_cache.invalidate((None, email))
+
+def _register_principal_invalidation(model, role: str):
+    def _invalidate(mapper, connection, target):
+        emails = {target.email, *inspect(target).attrs.email.history.deleted}
+        pending = object_session(target).info.setdefault("invalidated_principals", set())
+        for email in emails:
+            invalidate_principal(role, email)
+            pending.add((role, email))
+
+    event.listen(model, "after_update", _invalidate)
+    event.listen(model, "after_delete", _invalidate)
+
+def _register_password_change_revocation(model, role: str):
+    # Un cambio de contraseña invalida todas las sesiones de la cuenta, en la misma transacción
+    def _revoke(mapper, connection, target):
+        state = inspect(target)
+        if not state.attrs.hashed_password.history.has_changes():
+            return
+        emails = {target.email, *state.attrs.email.history.deleted}
+        _revoke_account_refresh_tokens(connection, role, [email for email in emails if email])
+
+    event.listen(model, "after_update", _revoke)
+
+for _role, _model in ROLE_MODELS.items():
+    _register_principal_invalidation(_model, _role)
+    _register_password_change_revocation(_model, _role)
+
+@event.listens_for(Session, "after_commit")
+def _invalidate_committed_principals(session):
+    # Segunda invalidación tras el commit por si otra petición recargó la fila antigua
+    for role, email in session.info.pop("invalidated_principals", ()):
+        invalidate_principal(role, email)
+
 async def get_current_admin(current_user = Depends(get_current_user)):
     if current_user["role"] != "admin":
         raise HTTPException(
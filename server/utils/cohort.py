@@ -0,0 +1,165 @@
+from datetime import date, datetime
+from typing import Optional
+import numpy as np
+from sqlalchemy import and_, case, func, select
+from sqlalchemy.orm import Session, aliased
+import models.models as models
+from utils.dashboard import ACTIVITY_WINDOW_DAYS
+
+# Columnas numéricas de la cohorte, válidas para ordenar y filtrar
+SORTABLE_COLUMNS = (
+    "user_id",
+    "workout_total", "workout_completed", "workout_rate",
+    "nutrition_total", "nutrition_completed", "nutrition_rate",
+    "initial_weight", "current_weight", "weight_change",
+    "workout_days", "days_since_workout",
+)
+COUNT_COLUMNS = ("workout_total", "workout_completed", "nutrition_total", "nutrition_completed", "workout_days")
+DAY_COLUMNS = ("days_since_workout",)
+
+
+def _as_day(value) -> Optional[date]:
+    return value.date() if isinstance(value, datetime) else value
+
+
+def _rollup_columns(db: Session, rollup, clients, start_day, end_day):
+    """Per-client totals inside the window and the last logged day overall, in one grouped query"""
+    bounds = []
+    if start_day is not None:
+        bounds.append(rollup.c.day >= start_day)
+    if end_day is not None:
+        bounds.append(rollup.c.day <= end_day)
+    in_window = and_(True, *bounds)
+    return db.execute(
+        select(
+            rollup.c.user_id,
+            func.sum(case((in_window, rollup.c.total), else_=0)),
+            func.sum(case((in_window, rollup.c.completed), else_=0)),
+            func.sum(case((in_window, 1), else_=0)),
+            func.max(rollup.c.day),
+        ).where(rollup.c.user_id.in_(clients)).group_by(rollup.c.user_id)
+    ).all()
+
+
+def _weight_rows(db: Session, clients, start_date, end_date):
+    """(user_id, initial weight, current weight) per client: summary row or first/last metric in the window"""
+    if start_date is None and end_date is None:
+        summary = models.UserProgressSummary
+        return db.execute(
+            select(summary.user_id, summary.first_weight, summary.latest_weight)
+            .where(summary.user_id.in_(clients))
+        ).all()
+
+    metrics = models.UserMetrics
+    bounds = select(
+        metrics.user_id, func.min(metrics.date).label("first_date"), func.max(metrics.date).label("last_date")
+    ).where(
+        metrics.user_id.in_(clients), metrics.date.between(start_date, end_date)
+    ).group_by(metrics.user_id).subquery()
+    first, last = aliased(metrics), aliased(metrics)
+    # Con varias mediciones en la misma fecha: la de menor id abre y la de mayor id cierra
+    return db.execute(
+        select(bounds.c.user_id, first.weight, last.weight)
+        .join(first, and_(first.user_id == bounds.c.user_id, first.date == bounds.c.first_date))
+        .join(last, and_(last.user_id == bounds.c.user_id, last.date == bounds.c.last_date))
+        .order_by(bounds.c.user_id, first.id, last.id.desc())
+    ).all()
+
+
+def _scatter(ids: np.ndarray, rows, width: int) -> list:
+    """Place grouped rows (user_id, *values) at their client's position, one float array per value"""
+    columns = [np.full(len(ids), np.nan) for _ in range(width)]
+    if not rows:
+        return columns
+    row_ids = np.array([row[0] for row in rows], dtype=np.int64)
+    # Solo la primera fila de cada usuario (las siguientes son empates de fecha)
+    row_ids, first_rows = np.unique(row_ids, return_index=True)
+    positions = np.searchsorted(ids, row_ids)
+    for index, column in enumerate(columns):
+        values = np.array([rows[row][index + 1] for row in first_rows], dtype=float)
+        column[positions] = values
+    return columns
+
+
+def compute_cohort(db: Session, trainer_id: int, start_date: Optional[datetime], end_date: Optional[datetime]) -> dict:
+    """Column arrays with completion, weight change and activity for every client of a trainer"""
+    clients = select(models.User.id).where(models.User.trainer_id == trainer_id)
+    users = db.execute(
+        select(models.User.id, models.User.email, models.User.full_name)
+        .where(models.User.trainer_id == trainer_id).order_by(models.User.id)
+    ).all()
+    ids = np.array([user.id for user in users], dtype=np.int64)
+    start_day, end_day = _as_day(start_date), _as_day(end_date)
+
+    workout = _rollup_columns(db, models.WorkoutDailyRollup.__table__, clients, start_day, end_day)
+    nutrition = _rollup_columns(db, models.NutritionDailyRollup.__table__, clients, start_day, end_day)
+    workout_total, workout_completed, workout_days, last_workout = _scatter(
+        ids, [(*row[:4], row[4].toordinal()) for row in workout], 4
+    )
+    nutrition_total, nutrition_completed = _scatter(ids, [row[:3] for row in nutrition], 2)
+    initial_weight, current_weight = _scatter(ids, _weight_rows(db, clients, start_date, end_date), 2)
+
+    # Sin registros en la ventana cuentan como cero, no como desconocido
+    workout_total, workout_completed, nutrition_total, nutrition_completed, workout_days = (
+        np.nan_to_num(column)
+        for column in (workout_total, workout_completed, nutrition_total, nutrition_completed, workout_days)
+    )
+    with np.errstate(invalid="ignore", divide="ignore"):
+        workout_rate = np.where(workout_total > 0, workout_completed / workout_total * 100, 0.0)
+        nutrition_rate = np.where(nutrition_total > 0, nutrition_completed / nutrition_total * 100, 0.0)
+    days_since_workout = date.today().toordinal() - last_workout
+
+    return {
+        "user_id": ids,
+        "email": np.array([user.email for user in users], dtype=object),
+        "full_name": np.array([user.full_name for user in users], dtype=object),
+        "workout_total": workout_total,
+        "workout_completed": workout_completed,
+        "workout_rate": np.round(workout_rate, 2),
+        "nutrition_total": nutrition_total,
+        "nutrition_completed": nutrition_completed,
+        "nutrition_rate": np.round(nutrition_rate, 2),
+        "initial_weight": initial_weight,
+        "current_weight": current_weight,
+        "weight_change": np.round(current_weight - initial_weight, 2),
+        "workout_days": workout_days,
+        "days_since_workout": days_since_workout,
+        # Activo: entrenamiento registrado en la ventana del panel del entrenador
+        "active": days_since_workout <= ACTIVITY_WINDOW_DAYS,
+    }
+
+
+def select_cohort(cohort: dict, ranges: dict, active: Optional[bool] = None,
+                  sort_by: str = "user_id", descending: bool = False) -> np.ndarray:
+    """Row order after filtering by {column: (min, max)} ranges and sorting with missing values last"""
+    keep = np.ones(len(cohort["user_id"]), dtype=bool)
+    for column, (low, high) in ranges.items():
+        # NaN no cumple ningún rango: sin datos queda fuera del filtro
+        if low is not None:
+            keep &= cohort[column] >= low
+        if high is not None:
+            keep &= cohort[column] <= high
+    if active is not None:
+        keep &= cohort["active"] == active
+
+    rows = np.nonzero(keep)[0]
+    values = cohort[sort_by][rows].astype(float)
+    key = np.where(np.isnan(values), np.inf, -values if descending else values)
+    # Desempate estable por id de usuario
+    return rows[np.lexsort((cohort["user_id"][rows], key))]
+
+
+def cohort_rows(cohort: dict, order: np.ndarray) -> list:
+    """JSON rows in the given order; NaN becomes null"""
+    columns = {}
+    for name, values in cohort.items():
+        values = values[order]
+        if name in COUNT_COLUMNS or name == "user_id":
+            columns[name] = values.astype(np.int64).tolist()
+        elif name in DAY_COLUMNS:
+            columns[name] = [None if np.isnan(value) else int(value) for value in values]
+        elif values.dtype.kind == "f":
+            columns[name] = np.where(np.isnan(values), None, values).tolist()
+        else:
+            columns[name] = values.tolist()
+    return [dict(zip(columns, row)) for row in zip(*columns.values())]
@@ -0,0 +1,187 @@
+import os
+from datetime import datetime, timedelta
+from sqlalchemy import Integer, event, func, inspect, select, update
+from sqlalchemy.orm import Session, object_session
+import models.models as models
+from utils.cache import TTLCache
+
+trainer_stats_cache = TTLCache(
+    max_size=int(os.getenv("TRAINER_STATS_CACHE_MAX_SIZE", "10000")),
+    ttl=float(os.getenv("TRAINER_STATS_CACHE_TTL_SECONDS", "30"))
+)
+
+ACTIVITY_WINDOW_DAYS = 30
+
+counters = models.DashboardCounters.__table__
+COUNTERS_ROW_ID = 1
+# Columna de dashboard_counters que mantiene cada modelo
+COUNTED_MODELS = {
+    models.User: "users",
+    models.Trainer: "trainers",
+    models.WorkoutPlan: "workout_plans",
+    models.NutritionPlan: "nutrition_plans",
+}
+
+
+def compute_trainer_stats(db: Session, trainer_id: int) -> dict:
+    """Compute the trainer dashboard figures in a single statement of scalar subqueries"""
+    since = datetime.utcnow() - timedelta(days=ACTIVITY_WINDOW_DAYS)
+    clients = select(models.User.id).where(models.User.trainer_id == trainer_id)
+
+    def completion(model):
+        return select(func.avg(model.completed.cast(Integer)) * 100).where(
+            model.user_id.in_(clients), model.date >= since
+        ).scalar_subquery()
+
+    row = db.execute(select(
+        select(func.count()).select_from(models.User)
+            .where(models.User.trainer_id == trainer_id).scalar_subquery(),
+        select(func.count()).select_from(models.WorkoutPlan)
+            .where(models.WorkoutPlan.trainer_id == trainer_id).scalar_subquery(),
+        select(func.count()).select_from(models.NutritionPlan)
+            .where(models.NutritionPlan.trainer_id == trainer_id).scalar_subquery(),
+        # Usuarios activos: han registrado progreso de entrenamiento en la ventana
+        select(func.count(models.WorkoutProgress.user_id.distinct())).where(
+            models.WorkoutProgress.user_id.in_(clients), models.WorkoutProgress.date >= since
+        ).scalar_subquery(),
+        completion(models.WorkoutProgress),
+        completion(models.NutritionProgress),
+    )).one()
+    users, workout_plans, nutrition_plans, active_users, workout, nutrition = row
+    return {
+        "total_stats": {
+            "users": users,
+            "workout_plans": workout_plans,
+            "nutrition_plans": nutrition_plans,
+            "active_users": active_users
+        },
+        "completion_rates": {
+            "workout": round(workout or 0, 2),
+            "nutrition": round(nutrition or 0, 2)
+        }
+    }
+
+
+def get_trainer_stats(db: Session, trainer_id: int) -> dict:
+    """Trainer dashboard figures, served from a short-TTL cache invalidated on writes; db must be the primary"""
+    stats = trainer_stats_cache.get(trainer_id)
+    if stats is None:
+        stats = compute_trainer_stats(db, trainer_id)
+        trainer_stats_cache.set(trainer_id, stats)
+    return stats
+
+
+def _count_totals(db: Session) -> dict:
+    return {
+        column: db.execute(select(func.count()).select_from(model)).scalar()
+        for model, column in COUNTED_MODELS.items()
+    }
+
+
+def get_admin_dashboard_stats(db: Session) -> dict:
+    """Admin dashboard figures: the counters row plus indexed created_at range counts"""
+    since = datetime.utcnow() - timedelta(days=ACTIVITY_WINDOW_DAYS)
+    row = db.execute(select(
+        counters.c.users,
+        counters.c.trainers,
+        counters.c.workout_plans,
+        counters.c.nutrition_plans,
+        select(func.count()).select_from(models.User)
+            .where(models.User.created_at >= since).scalar_subquery(),
+        select(func.count()).select_from(models.Trainer)
+            .where(models.Trainer.created_at >= since).scalar_subquery(),
+    ).where(counters.c.id == COUNTERS_ROW_ID)).first()
+    if row is None:
+        # Sin fila (aún no migrada o reconciliada): se cuenta en vivo, sin escribir desde una lectura
+        totals = _count_totals(db)
+        row = (*totals.values(), *db.execute(select(
+            select(func.count()).select_from(models.User)
+                .where(models.User.created_at >= since).scalar_subquery(),
+            select(func.count()).select_from(models.Trainer)
+                .where(models.Trainer.created_at >= since).scalar_subquery(),
+        )).one())
+    users, trainers, workout_plans, nutrition_plans, new_users, new_trainers = row
+    return {
+        "total_stats": {
+            "users": users,
+            "trainers": trainers,
+            "workout_plans": workout_plans,
+            "nutrition_plans": nutrition_plans
+        },
+        "monthly_stats": {
+            "new_users": new_users,
+            "new_trainers": new_trainers
+        }
+    }
+
+
+def reconcile_dashboard_counters(db: Session) -> dict:
+    """Recount the totals from the source tables and overwrite the counters row"""
+    totals = _count_totals(db)
+    values = {**totals, "reconciled_at": datetime.utcnow()}
+    if db.execute(update(counters).where(counters.c.id == COUNTERS_ROW_ID).values(**values)).rowcount == 0:
+        db.execute(counters.insert().values(id=COUNTERS_ROW_ID, **values))
+    db.commit()
+    return totals
+
+
+def _register_counter(model, column: str):
+    # Se actualiza en la misma transacción que el alta o la baja
+    def _adjust(delta: int):
+        def _on_write(mapper, connection, target):
+            connection.execute(
+                update(counters)
+                .where(counters.c.id == COUNTERS_ROW_ID)
+                .values({column: counters.c[column] + delta})
+            )
+        return _on_write
+
+    event.listen(model, "after_insert", _adjust(1))
+    event.listen(model, "after_delete", _adjust(-1))
+
+
+for _model, _column in COUNTED_MODELS.items():
+    _register_counter(_model, _column)
+
+
+def _invalidate(target, trainer_ids) -> None:
+    pending = object_session(target).info.setdefault("stale_trainer_stats", set())
+    for trainer_id in trainer_ids:
+        if trainer_id is not None:
+            trainer_stats_cache.invalidate(trainer_id)
+            pending.add(trainer_id)
+
+
+def _register_owner_invalidation(model):
+    # Usuarios y planes guardan directamente el entrenador al que pertenecen
+    def _on_write(mapper, connection, target):
+        _invalidate(target, {target.trainer_id, *inspect(target).attrs.trainer_id.history.deleted})
+
+    for name in ("after_insert", "after_update", "after_delete"):
+        event.listen(model, name, _on_write)
+
+
+def _register_progress_invalidation(model):
+    # El progreso solo conoce al usuario: se busca su entrenador por clave primaria
+    def _on_write(mapper, connection, target):
+        trainer_id = connection.execute(
+            select(models.User.trainer_id).where(models.User.id == target.user_id)
+        ).scalar()
+        _invalidate(target, {trainer_id})
+
+    for name in ("after_insert", "after_update", "after_delete"):
+        event.listen(model, name, _on_write)
+
+
+for _model in (models.User, models.WorkoutPlan, models.NutritionPlan):
+    _register_owner_invalidation(_model)
+
+for _model in (models.WorkoutProgress, models.NutritionProgress):
+    _register_progress_invalidation(_model)
+
+
+@event.listens_for(Session, "after_commit")
+def _invalidate_committed_trainer_stats(session):
+    # Segunda invalidación tras el commit por si otra petición recalculó con datos antiguos
+    for trainer_id in session.info.pop("stale_trainer_stats", ()):
+        trainer_stats_cache.invalidate(trainer_id)
@@ -0,0 +1,89 @@
+from typing import Optional
+from sqlalchemy import event, inspect
+from sqlalchemy.orm import Session
+import models.models as models
+
+# Orden de precedencia cuando un mismo email existe en varias tablas
+ROLE_MODELS = {
+    "admin": models.Admin,
+    "trainer": models.Trainer,
+    "user": models.User,
+}
+
+accounts = models.Account.__table__
+
+
+def get_account_model(role: str):
+    """Return the ORM model that stores accounts for the given role"""
+    return ROLE_MODELS.get(role, models.User)
+
+
+def resolve_identity(db: Session, email: str) -> Optional[models.Account]:
+    """Resolve an email to its identity entry with a single indexed query"""
+    entries = db.query(models.Account).filter(models.Account.email == email).all()
+    for role in ROLE_MODELS:
+        for entry in entries:
+            if entry.role == role:
+                return entry
+    return None
+
+
+def load_account(db: Session, identity: models.Account):
+    """Load the admin, trainer or user row an identity entry points to"""
+    return db.get(get_account_model(identity.role), identity.account_id)
+
+
+def rebuild_identity_index(db: Session) -> int:
+    """Rebuild the identity index from the admins, trainers and users tables"""
+    db.execute(accounts.delete())
+    total = 0
+    for role, model in ROLE_MODELS.items():
+        rows = db.query(model.id, model.email, model.hashed_password).all()
+        if rows:
+            db.execute(accounts.insert(), [
+                {
+                    "email": row.email,
+                    "role": role,
+                    "account_id": row.id,
+                    "hashed_password": row.hashed_password
+                }
+                for row in rows
+            ])
+        total += len(rows)
+    db.commit()
+    return total
+
+
+def _register_identity_sync(model, role: str):
+    # Los eventos se ejecutan dentro del flush, en la misma transacción que la escritura
+    @event.listens_for(model, "after_insert")
+    def _after_insert(mapper, connection, target):
+        connection.execute(accounts.insert().values(
+            email=target.email,
+            role=role,
+            account_id=target.id,
+            hashed_password=target.hashed_password
+        ))
+
+    @event.listens_for(model, "after_update")
+    def _after_update(mapper, connection, target):
+        state = inspect(target)
+        if not (state.attrs.email.history.has_changes()
+                or state.attrs.hashed_password.history.has_changes()):
+            return
+        connection.execute(
+            accounts.update()
+            .where(accounts.c.role == role, accounts.c.account_id == target.id)
+            .values(email=target.email, hashed_password=target.hashed_password)
+        )
+
+    @event.listens_for(model, "after_delete")
+    def _after_delete(mapper, connection, target):
+        connection.execute(
+            accounts.delete()
+            .where(accounts.c.role == role, accounts.c.account_id == target.id)
+        )
+
+
+for _role, _model in ROLE_MODELS.items():
+    _register_identity_sync(_model, _role)
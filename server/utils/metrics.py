@@ -1,51 +1,66 @@
 from datetime import datetime, timedelta
 from typing import List, Optional
 from sqlalchemy.orm import Session
-from sqlalchemy import Integer, func
+from sqlalchemy import func
 import models.models as models
+import utils.rollups  # registra el mantenimiento de los resúmenes diarios
+import utils.progress_summary  # registra el mantenimiento del resumen de progreso
 
 def calculate_bmi(weight: float, height: float) -> float:
     """Calculate BMI given weight in kg and height in meters"""
     return weight / (height * height)
 
+def _progress_stats(initial_weight, current_weight, initial_body_fat, current_body_fat, initial_date, current_date):
+    return {
+        "initial_weight": initial_weight,
+        "current_weight": current_weight,
+        "weight_change": round(current_weight - initial_weight, 2) if initial_weight and current_weight else None,
+        "initial_body_fat": initial_body_fat,
+        "current_body_fat": current_body_fat,
+        "body_fat_change": round(current_body_fat - initial_body_fat, 2) if initial_body_fat and current_body_fat else None,
+        "initial_date": initial_date,
+        "current_date": current_date,
+        "days_tracked": (current_date - initial_date).days
+    }
+
 def calculate_progress_stats(metrics: List[models.UserMetrics]):
-    """Calculate progress statistics from a list of metrics"""
+    """Calculate progress statistics from a list of metrics already ordered by date"""
     if not metrics:
         return None
     
-    sorted_metrics = sorted(metrics, key=lambda x: x.date)
-    initial = sorted_metrics[0]
-    current = sorted_metrics[-1]
-    
-    return {
-        "initial_weight": initial.weight,
-        "current_weight": current.weight,
-        "weight_change": round(current.weight - initial.weight, 2) if initial.weight and current.weight else None,
-        "initial_body_fat": initial.body_fat,
-        "current_body_fat": current.body_fat,
-        "body_fat_change": round(current.body_fat - initial.body_fat, 2) if initial.body_fat and current.body_fat else None,
-        "initial_date": initial.date,
-        "current_date": current.date,
-        "days_tracked": (current.date - initial.date).days
-    }
+    initial = metrics[0]
+    current = metrics[-1]
+    return _progress_stats(
+        initial.weight, current.weight, initial.body_fat, current.body_fat, initial.date, current.date
+    )
+
+def summary_progress_stats(summary: Optional[models.UserProgressSummary]):
+    """All-time progress statistics from the user's summary row"""
+    if summary is None:
+        return None
+    return _progress_stats(
+        summary.first_weight, summary.latest_weight, summary.first_body_fat, summary.latest_body_fat,
+        summary.first_date, summary.latest_date
+    )
 
-def get_user_completion_rates(db: Session, user_id: int, start_date: datetime, end_date: datetime):
-    """Calculate completion rates for workout and nutrition plans"""
-    workout_stats = db.query(
-        func.count(models.WorkoutProgress.id).label('total'),
-        func.sum(models.WorkoutProgress.completed.cast(Integer)).label('completed')
-    ).filter(
-        models.WorkoutProgress.user_id == user_id,
-        models.WorkoutProgress.date.between(start_date, end_date)
-    ).first()
+def _rollup_totals(db: Session, rollup, user_id: int, start_day, end_day):
+    query = db.query(
+        func.coalesce(func.sum(rollup.c.total), 0).label('total'),
+        func.coalesce(func.sum(rollup.c.completed), 0).label('completed')
+    ).filter(rollup.c.user_id == user_id)
+    if start_day is not None:
+        query = query.filter(rollup.c.day >= start_day)
+    if end_day is not None:
+        query = query.filter(rollup.c.day <= end_day)
+    return query.first()
 
-    nutrition_stats = db.query(
-        func.count(models.NutritionProgress.id).label('total'),
-        func.sum(models.NutritionProgress.completed.cast(Integer)).label('completed')
-    ).filter(
-        models.NutritionProgress.user_id == user_id,
-        models.NutritionProgress.date.between(start_date, end_date)
-    ).first()
+def get_user_completion_rates(db: Session, user_id: int, start_date: Optional[datetime], end_date: Optional[datetime]):
+    """Calculate completion rates for workout and nutrition plans from the daily rollups; None leaves a side open"""
+    # Días completos entre ambas fechas: como mucho una fila por día y usuario en cada tabla
+    start_day = start_date.date() if isinstance(start_date, datetime) else start_date
+    end_day = end_date.date() if isinstance(end_date, datetime) else end_date
+    workout_stats = _rollup_totals(db, models.WorkoutDailyRollup.__table__, user_id, start_day, end_day)
+    nutrition_stats = _rollup_totals(db, models.NutritionDailyRollup.__table__, user_id, start_day, end_day)
 
     return {
         "workout": {
@@ -58,4 +73,4 @@ def get_user_completion_rates(db: Session, user_id: int, start_date: datetime, e
             "completed": nutrition_stats.completed or 0,
             "rate": round(nutrition_stats.completed / nutrition_stats.total * 100, 2) if nutrition_stats.total else 0
         }
-    }
\ No newline at end of file
+    }
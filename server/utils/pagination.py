@@ -0,0 +1,99 @@
+import base64
+import json
+from datetime import date, datetime
+from typing import List, Optional, Sequence
+from fastapi import HTTPException, status
+from sqlalchemy import and_, or_
+
+MAX_PAGE_SIZE = 200
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+
+
+def _json_default(value):
+    if isinstance(value, (date, datetime)):
+        return value.isoformat()
+    raise TypeError(f"{type(value).__name__} is not serializable in a cursor")
+
+
+def invalid_cursor() -> HTTPException:
+    return HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Cursor inválido")
+
+
+def encode_cursor(payload: dict) -> str:
+    """Serialize a cursor payload to an opaque URL-safe token"""
+    raw = json.dumps(payload, default=_json_default, separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(token: str) -> dict:
+    """Parse a token produced by encode_cursor, rejecting anything malformed with a 400"""
+    try:
+        payload = json.loads(base64.urlsafe_b64decode(token + "=" * (-len(token) % 4)))
+    except ValueError:
+        raise invalid_cursor()
+    if not isinstance(payload, dict):
+        raise invalid_cursor()
+    return payload
+
+
+def _coerce(column, value):
+    if value is None:
+        return None
+    python_type = column.type.python_type
+    if python_type is datetime:
+        return datetime.fromisoformat(value)
+    if python_type is date:
+        return date.fromisoformat(value)
+    return python_type(value)
+
+
+def decode_keys(columns: Sequence, values) -> List:
+    """Convert the key values stored in a cursor back to the column types"""
+    try:
+        if len(values) != len(columns):
+            raise ValueError
+        return [_coerce(column, value) for column, value in zip(columns, values)]
+    except (TypeError, ValueError):
+        raise invalid_cursor()
+
+
+def seek_after(columns: Sequence, values: Sequence, descending: bool = True):
+    """Predicate selecting the rows that sort strictly after the given key values"""
+    # Forma expandida (a < x) OR (a = x AND b < y): la usan los índices compuestos en MySQL y SQLite
+    clauses = []
+    for position, column in enumerate(columns):
+        past = column < values[position] if descending else column > values[position]
+        equal = [previous == value for previous, value in zip(columns[:position], values[:position])]
+        clauses.append(and_(*equal, past))
+    return or_(*clauses)
+
+
+def paginate(stmt, columns: Sequence, after: Optional[Sequence] = None, limit: int = 50, descending: bool = True):
+    """Apply keyset ordering and seek to a select; fetches one extra row to detect more pages"""
+    if after is not None:
+        stmt = stmt.where(seek_after(columns, after, descending))
+    order = [column.desc() if descending else column.asc() for column in columns]
+    return stmt.order_by(*order).limit(limit + 1)
+
+
+def split_page(rows: Sequence, columns: Sequence, limit: int):
+    """Drop the look-ahead row; return the page and the key values to continue after, if any"""
+    if len(rows) <= limit:
+        return list(rows), None
+    rows = list(rows[:limit])
+    return rows, [getattr(rows[-1], column.key) for column in columns]
+
+
+def keyset_list(query, columns: Sequence, response, cursor: Optional[str] = None, skip: int = 0, limit: int = 100):
+    """Page an ORM query by its key columns; the continuation token goes in X-Next-Cursor"""
+    # Un limit mayor que el máximo se recorta en vez de rechazarse: los clientes siguen con el cursor
+    limit = min(limit, MAX_PAGE_SIZE)
+    after = decode_keys(columns, decode_cursor(cursor).get("after")) if cursor else None
+    query = paginate(query, columns, after, limit, descending=False)
+    # El offset clásico se mantiene por compatibilidad, solo sin cursor
+    if after is None and skip:
+        query = query.offset(skip)
+    rows, last_key = split_page(query.all(), columns, limit)
+    if last_key:
+        response.headers[NEXT_CURSOR_HEADER] = encode_cursor({"after": last_key})
+    return rows
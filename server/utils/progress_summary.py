@@ -0,0 +1,113 @@
+from typing import Optional
+from sqlalchemy import case, event, func, inspect, literal, select, update
+from sqlalchemy.dialects import mysql, sqlite
+from sqlalchemy.orm import Session
+import models.models as models
+
+summary = models.UserProgressSummary.__table__
+metrics = models.UserMetrics.__table__
+SUMMARY_FIELDS = ("weight", "body_fat", "muscle_mass")
+
+
+def _merge(new) -> list:
+    """SET clauses folding one new measurement (columns of `new`) into an existing summary row"""
+    is_latest = new["latest_date"] >= summary.c.latest_date
+    is_first = new["first_date"] < summary.c.first_date
+    # Los valores van antes que las fechas: MySQL evalúa las asignaciones en orden
+    return [
+        *((summary.c[f"latest_{field}"], case((is_latest, new[f"latest_{field}"]), else_=summary.c[f"latest_{field}"]))
+          for field in SUMMARY_FIELDS),
+        *((summary.c[f"first_{field}"], case((is_first, new[f"first_{field}"]), else_=summary.c[f"first_{field}"]))
+          for field in SUMMARY_FIELDS),
+        (summary.c.latest_date, case((is_latest, new["latest_date"]), else_=summary.c.latest_date)),
+        (summary.c.first_date, case((is_first, new["first_date"]), else_=summary.c.first_date)),
+        (summary.c.metrics_count, summary.c.metrics_count + 1),
+    ]
+
+
+def _add_measurement(connection, target) -> None:
+    """Fold a newly inserted metrics row into its user's summary with the dialect's upsert"""
+    values = {"user_id": target.user_id, "metrics_count": 1, "first_date": target.date, "latest_date": target.date}
+    for field in SUMMARY_FIELDS:
+        values[f"first_{field}"] = values[f"latest_{field}"] = getattr(target, field)
+
+    dialect = connection.dialect.name
+    if dialect == "sqlite":
+        stmt = sqlite.insert(summary).values(**values)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[summary.c.user_id],
+            set_={column.key: value for column, value in _merge(stmt.excluded)}
+        )
+    elif dialect in ("mysql", "mariadb"):
+        stmt = mysql.insert(summary).values(**values)
+        stmt = stmt.on_duplicate_key_update(_merge(stmt.inserted))
+    else:
+        new = {name: literal(value, summary.c[name].type) for name, value in values.items()}
+        result = connection.execute(
+            update(summary).where(summary.c.user_id == target.user_id).ordered_values(*_merge(new))
+        )
+        if result.rowcount:
+            return
+        stmt = summary.insert().values(**values)
+    connection.execute(stmt)
+
+
+def _rebuild(connection, user_id: Optional[int] = None) -> int:
+    """Recompute summary rows from user_metrics; ties on a date go to the lowest/highest id"""
+    delete = summary.delete()
+    source = select(
+        metrics.c.user_id, func.count(metrics.c.id), func.min(metrics.c.date), func.max(metrics.c.date)
+    ).where(metrics.c.user_id.isnot(None)).group_by(metrics.c.user_id)
+    if user_id is not None:
+        delete = delete.where(summary.c.user_id == user_id)
+        source = source.where(metrics.c.user_id == user_id)
+    connection.execute(delete)
+    rows = connection.execute(
+        summary.insert().from_select(["user_id", "metrics_count", "first_date", "latest_date"], source)
+    ).rowcount
+
+    def measured(column, edge, order):
+        return select(column).where(
+            metrics.c.user_id == summary.c.user_id, metrics.c.date == edge
+        ).order_by(order).limit(1).scalar_subquery()
+
+    values = {}
+    for field in SUMMARY_FIELDS:
+        values[f"first_{field}"] = measured(metrics.c[field], summary.c.first_date, metrics.c.id)
+        values[f"latest_{field}"] = measured(metrics.c[field], summary.c.latest_date, metrics.c.id.desc())
+    fill = update(summary).values(**values)
+    if user_id is not None:
+        fill = fill.where(summary.c.user_id == user_id)
+    connection.execute(fill)
+    return rows
+
+
+@event.listens_for(models.UserMetrics, "after_insert")
+def _after_insert(mapper, connection, target):
+    if target.user_id is not None and target.date is not None:
+        _add_measurement(connection, target)
+
+
+@event.listens_for(models.UserMetrics, "after_update")
+def _after_update(mapper, connection, target):
+    state = inspect(target)
+    history = {name: state.attrs[name].history for name in ("user_id", "date", *SUMMARY_FIELDS)}
+    if not any(h.has_changes() for h in history.values()):
+        return
+    # Una edición puede cambiar la primera o la última medición: se recalcula el usuario
+    for user_id in {target.user_id, *history["user_id"].deleted}:
+        if user_id is not None:
+            _rebuild(connection, user_id)
+
+
+@event.listens_for(models.UserMetrics, "after_delete")
+def _after_delete(mapper, connection, target):
+    if target.user_id is not None:
+        _rebuild(connection, target.user_id)
+
+
+def rebuild_progress_summaries(db: Session, user_id: Optional[int] = None) -> int:
+    """Recompute the progress summaries from user_metrics, for one user or everyone"""
+    rows = _rebuild(db.connection(), user_id)
+    db.commit()
+    return rows
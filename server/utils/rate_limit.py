@@ -0,0 +1,98 @@
+import math
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Optional
+from fastapi import HTTPException, Request, status
+
+
+class TokenBucketLimiter:
+    """Token buckets per key, kept in LRU order so idle buckets are evicted in O(1)"""
+
+    def __init__(self, capacity: float, period: float, max_buckets: int = 10000):
+        self.capacity = capacity
+        self.rate = capacity / period
+        self.max_buckets = max_buckets
+        # Tras este tiempo sin uso un bucket vuelve a estar lleno y equivale a uno nuevo
+        self.idle_after = period
+        self._buckets: "OrderedDict[str, list]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def consume(self, key: str) -> float:
+        """Take one token for key; return 0 if allowed, otherwise seconds until retry"""
+        now = time.monotonic()
+        with self._lock:
+            self._evict_idle(now)
+            bucket = self._buckets.get(key)
+            if bucket is None:
+                bucket = [self.capacity, now]
+                self._buckets[key] = bucket
+                if len(self._buckets) > self.max_buckets:
+                    self._buckets.popitem(last=False)
+            else:
+                bucket[0] = min(self.capacity, bucket[0] + (now - bucket[1]) * self.rate)
+                bucket[1] = now
+                self._buckets.move_to_end(key)
+
+            if bucket[0] >= 1:
+                bucket[0] -= 1
+                return 0
+            return (1 - bucket[0]) / self.rate
+
+    def _evict_idle(self, now: float) -> None:
+        # El bucket más antiguo está al principio: basta con mirar la cabeza de la cola
+        while self._buckets:
+            key, bucket = next(iter(self._buckets.items()))
+            if now - bucket[1] < self.idle_after:
+                break
+            del self._buckets[key]
+
+
+def _parse_rule(value: str) -> Optional[tuple]:
+    """Parse a "capacity/period_seconds" rule; empty or "off" disables the limit"""
+    if not value or value.lower() == "off":
+        return None
+    capacity, period = value.split("/")
+    return float(capacity), float(period)
+
+
+class RouteRateLimit:
+    """Per-IP and per-account throttling for one route, configured via environment variables"""
+
+    def __init__(self, name: str, per_ip: str, per_account: str):
+        prefix = f"RATE_LIMIT_{name.upper()}"
+        ip_rule = _parse_rule(os.getenv(f"{prefix}_IP", per_ip))
+        account_rule = _parse_rule(os.getenv(f"{prefix}_ACCOUNT", per_account))
+        self.ip_limiter = TokenBucketLimiter(*ip_rule) if ip_rule else None
+        self.account_limiter = TokenBucketLimiter(*account_rule) if account_rule else None
+
+    @staticmethod
+    def _reject(retry_after: float):
+        raise HTTPException(
+            status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+            detail="Demasiadas solicitudes, inténtalo más tarde",
+            headers={"Retry-After": str(math.ceil(retry_after))},
+        )
+
+    def by_ip(self, request: Request) -> None:
+        """FastAPI dependency that throttles by client address"""
+        if self.ip_limiter is None:
+            return
+        client_ip = request.client.host if request.client else "unknown"
+        retry_after = self.ip_limiter.consume(client_ip)
+        if retry_after:
+            self._reject(retry_after)
+
+    def check_account(self, account: str) -> None:
+        """Throttle by account identifier; call before any hashing or DB work"""
+        if self.account_limiter is None or not account:
+            return
+        retry_after = self.account_limiter.consume(account.strip().lower())
+        if retry_after:
+            self._reject(retry_after)
+
+
+login_rate_limit = RouteRateLimit("login", per_ip="20/60", per_account="5/60")
+password_reset_request_rate_limit = RouteRateLimit("password_reset_request", per_ip="5/300", per_account="3/900")
+password_reset_rate_limit = RouteRateLimit("password_reset", per_ip="10/300", per_account="off")
@@ -80,7 +80,7 @@ def generate_user_report(db: Session, user_id: int, start_date: datetime, end_da
     metrics = db.query(models.UserMetrics).filter(
         models.UserMetrics.user_id == user_id,
         models.UserMetrics.date.between(start_date, end_date)
-    ).all()
+    ).order_by(models.UserMetrics.date).all()
     workout_progress = db.query(models.WorkoutProgress).filter(
         models.WorkoutProgress.user_id == user_id,
         models.WorkoutProgress.date.between(start_date, end_date)
@@ -0,0 +1,124 @@
+from datetime import date, datetime
+from typing import Optional
+from sqlalchemy import Integer, event, func, inspect, select, update
+from sqlalchemy.dialects import mysql, sqlite
+from sqlalchemy.orm import Session
+import models.models as models
+
+# Tabla de progreso -> tabla de resumen diario que la acompaña
+ROLLUPS = {
+    models.WorkoutProgress: models.WorkoutDailyRollup.__table__,
+    models.NutritionProgress: models.NutritionDailyRollup.__table__,
+}
+
+
+def _as_date(value) -> Optional[date]:
+    return value.date() if isinstance(value, datetime) else value
+
+
+def _increment(connection, rollup, user_id: int, day: date, total: int, completed: int) -> None:
+    """Add to a (user_id, day) rollup row, creating it if needed with the dialect's upsert"""
+    if total <= 0:
+        # Las bajas solo restan de filas que ya existen
+        connection.execute(
+            update(rollup)
+            .where(rollup.c.user_id == user_id, rollup.c.day == day)
+            .values(total=rollup.c.total + total, completed=rollup.c.completed + completed)
+        )
+        # Un día sin registros no deja fila, igual que tras una reconstrucción
+        connection.execute(
+            rollup.delete().where(rollup.c.user_id == user_id, rollup.c.day == day, rollup.c.total <= 0)
+        )
+        return
+
+    values = {"user_id": user_id, "day": day, "total": total, "completed": completed}
+    dialect = connection.dialect.name
+    if dialect == "sqlite":
+        stmt = sqlite.insert(rollup).values(**values)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[rollup.c.user_id, rollup.c.day],
+            set_={
+                "total": rollup.c.total + stmt.excluded.total,
+                "completed": rollup.c.completed + stmt.excluded.completed
+            }
+        )
+    elif dialect in ("mysql", "mariadb"):
+        stmt = mysql.insert(rollup).values(**values)
+        stmt = stmt.on_duplicate_key_update(
+            total=rollup.c.total + stmt.inserted.total,
+            completed=rollup.c.completed + stmt.inserted.completed
+        )
+    else:
+        result = connection.execute(
+            update(rollup)
+            .where(rollup.c.user_id == user_id, rollup.c.day == day)
+            .values(total=rollup.c.total + total, completed=rollup.c.completed + completed)
+        )
+        if result.rowcount:
+            return
+        stmt = rollup.insert().values(**values)
+    connection.execute(stmt)
+
+
+def _contribution(user_id, progress_date, completed):
+    if user_id is None or progress_date is None:
+        return None
+    return user_id, _as_date(progress_date), int(bool(completed))
+
+
+def _register_rollup_sync(model, rollup):
+    @event.listens_for(model, "after_insert")
+    def _after_insert(mapper, connection, target):
+        new = _contribution(target.user_id, target.date, target.completed)
+        if new:
+            _increment(connection, rollup, new[0], new[1], 1, new[2])
+
+    @event.listens_for(model, "after_update")
+    def _after_update(mapper, connection, target):
+        state = inspect(target)
+        history = {name: state.attrs[name].history for name in ("user_id", "date", "completed")}
+        if not any(h.has_changes() for h in history.values()):
+            return
+        # Valor anterior de cada columna: el borrado del historial o, si no cambió, el actual
+        old = _contribution(*(
+            h.deleted[0] if h.deleted else getattr(target, name) for name, h in history.items()
+        ))
+        new = _contribution(target.user_id, target.date, target.completed)
+        if old == new:
+            return
+        if old:
+            _increment(connection, rollup, old[0], old[1], -1, -old[2])
+        if new:
+            _increment(connection, rollup, new[0], new[1], 1, new[2])
+
+    @event.listens_for(model, "after_delete")
+    def _after_delete(mapper, connection, target):
+        old = _contribution(target.user_id, target.date, target.completed)
+        if old:
+            _increment(connection, rollup, old[0], old[1], -1, -old[2])
+
+
+for _model, _rollup in ROLLUPS.items():
+    _register_rollup_sync(_model, _rollup)
+
+
+def rebuild_daily_rollups(db: Session, user_id: Optional[int] = None) -> int:
+    """Recompute the daily rollups from the raw progress tables, for one user or everyone"""
+    rows = 0
+    for model, rollup in ROLLUPS.items():
+        delete = rollup.delete()
+        source = select(
+            model.user_id,
+            func.date(model.date),
+            func.count(model.id),
+            func.coalesce(func.sum(model.completed.cast(Integer)), 0)
+        ).where(model.user_id.isnot(None)).group_by(model.user_id, func.date(model.date))
+        if user_id is not None:
+            delete = delete.where(rollup.c.user_id == user_id)
+            source = source.where(model.user_id == user_id)
+        db.execute(delete)
+        rows += db.execute(
+            rollup.insert().from_select(["user_id", "day", "total", "completed"], source)
+        ).rowcount
+    db.commit()
+    return rows
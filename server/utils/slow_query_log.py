@@ -0,0 +1,117 @@
+import json
+import logging
+import threading
+import time
+from collections import deque
+from datetime import datetime, timezone
+from sqlalchemy import event
+
+from utils.sql_instrumentation import current_request_stats
+
+logger = logging.getLogger("fitness.sql.slow")
+
+# Prefijo para obtener el plan de ejecución en cada dialecto
+EXPLAIN_PREFIXES = {
+    "sqlite": "EXPLAIN QUERY PLAN ",
+    "mysql": "EXPLAIN ",
+    "mariadb": "EXPLAIN ",
+    "postgresql": "EXPLAIN ",
+}
+
+MAX_PARAMETER_LENGTH = 100
+
+
+def _truncate(value):
+    if isinstance(value, (bytes, str)) and len(value) > MAX_PARAMETER_LENGTH:
+        return value[:MAX_PARAMETER_LENGTH] + ("..." if isinstance(value, str) else b"...")
+    return value
+
+
+def _format_parameters(parameters):
+    if isinstance(parameters, dict):
+        return {key: repr(_truncate(value)) for key, value in parameters.items()}
+    if isinstance(parameters, (list, tuple)):
+        return [repr(_truncate(value)) for value in parameters]
+    return repr(parameters)
+
+
+class SlowQueryLog:
+    """Bounded ring buffer of statements slower than a threshold, with their EXPLAIN plan"""
+
+    def __init__(self, threshold_ms: float = 200, max_entries: int = 100, explain: bool = True):
+        self.threshold = threshold_ms / 1000
+        self.explain = explain
+        self._entries = deque(maxlen=max_entries)
+        self._lock = threading.Lock()
+        self.recorded = 0
+
+    def attach(self, engine) -> None:
+        event.listen(engine, "before_cursor_execute", self._before_cursor_execute)
+        event.listen(engine, "after_cursor_execute", self._after_cursor_execute)
+
+    def _before_cursor_execute(self, conn, cursor, statement, parameters, context, executemany):
+        # En el contexto de ejecución y no en conn.info: una sentencia fallida no deja restos
+        if context is not None:
+            context._slow_query_started_at = time.perf_counter()
+
+    def _after_cursor_execute(self, conn, cursor, statement, parameters, context, executemany):
+        started = getattr(context, "_slow_query_started_at", None)
+        if started is None:
+            return
+        elapsed = time.perf_counter() - started
+        if elapsed < self.threshold:
+            return
+
+        stats = current_request_stats()
+        entry = {
+            "recorded_at": datetime.now(timezone.utc).isoformat(),
+            "duration_ms": round(elapsed * 1000, 2),
+            "statement": statement,
+            "parameters": None if executemany else _format_parameters(parameters),
+            "executemany": executemany,
+            "route": (stats.route or stats.path) if stats else None,
+            "method": stats.method if stats else None,
+            "database": conn.engine.url.render_as_string(hide_password=True),
+            "explain": self._explain(conn, statement, parameters) if self.explain and not executemany else None,
+        }
+        with self._lock:
+            self._entries.append(entry)
+            self.recorded += 1
+        logger.warning(json.dumps(
+            {key: entry[key] for key in ("duration_ms", "route", "statement")}, ensure_ascii=False
+        ))
+
+    @staticmethod
+    def _explain(conn, statement: str, parameters):
+        prefix = EXPLAIN_PREFIXES.get(conn.dialect.name)
+        if prefix is None or not statement.lstrip().upper().startswith("SELECT"):
+            return None
+        # Cursor DBAPI aparte: no dispara eventos ni toca el resultado de la consulta original
+        cursor = conn.connection.cursor()
+        try:
+            cursor.execute(prefix + statement, parameters)
+            columns = [column[0] for column in cursor.description or []]
+            return [dict(zip(columns, row)) for row in cursor.fetchall()]
+        except Exception as e:
+            return [{"error": str(e)}]
+        finally:
+            cursor.close()
+
+    def entries(self, limit: int = None) -> list:
+        with self._lock:
+            entries = list(reversed(self._entries))
+        return entries[:limit] if limit else entries
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "threshold_ms": self.threshold * 1000,
+                "max_entries": self._entries.maxlen,
+                "size": len(self._entries),
+                "recorded": self.recorded,
+                "explain": self.explain
+            }
@@ -0,0 +1,131 @@
+import json
+import logging
+import os
+import re
+import time
+from collections import Counter
+from contextvars import ContextVar
+from typing import Optional
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+logger = logging.getLogger("fitness.sql")
+
+SQL_INSTRUMENTATION = os.getenv("SQL_INSTRUMENTATION", "true").lower() in ("1", "true", "yes")
+# Una misma forma de sentencia repetida este número de veces en una petición se marca como N+1
+SQL_N_PLUS_ONE_THRESHOLD = int(os.getenv("SQL_N_PLUS_ONE_THRESHOLD", "5"))
+
+_PARAM_LIST = re.compile(r"\(\s*(?:\?|%s|:\w+|%\(\w+\)s)(?:\s*,\s*(?:\?|%s|:\w+|%\(\w+\)s))*\s*\)")
+_WHITESPACE = re.compile(r"\s+")
+
+
+def statement_shape(statement: str) -> str:
+    """Normalize a statement so executions that differ only in parameters compare equal"""
+    shape = _WHITESPACE.sub(" ", statement).strip()
+    return _PARAM_LIST.sub("(?)", shape)
+
+
+class RequestQueryStats:
+    """SQL statements issued while serving one request"""
+
+    def __init__(self, scope: dict):
+        self.scope = scope
+        self.method = scope["method"]
+        self.path = scope["path"]
+        self.queries = 0
+        self.db_time = 0.0
+        self.shapes: Counter = Counter()
+
+    @property
+    def route(self) -> Optional[str]:
+        # El router guarda la ruta resuelta en el scope al despachar la petición
+        route = self.scope.get("route")
+        return getattr(route, "path", None)
+
+    def record(self, statement: str, elapsed: float) -> None:
+        self.queries += 1
+        self.db_time += elapsed
+        self.shapes[statement_shape(statement)] += 1
+
+    def repeated(self, threshold: int = 2) -> list:
+        return [(shape, count) for shape, count in self.shapes.most_common() if count >= threshold]
+
+    def server_timing(self) -> str:
+        return f'db;dur={self.db_time * 1000:.1f};desc="{self.queries} queries"'
+
+
+_current_stats: ContextVar[Optional[RequestQueryStats]] = ContextVar("request_query_stats", default=None)
+
+
+def current_request_stats() -> Optional[RequestQueryStats]:
+    """Stats for the request being served in this context, if any"""
+    return _current_stats.get()
+
+
+# Se escucha en la clase Engine para cubrir el primario, el motor asíncrono y las réplicas
+@event.listens_for(Engine, "before_cursor_execute")
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    # El inicio va en el contexto de ejecución: si la sentencia falla se descarta con él
+    if _current_stats.get() is not None and context is not None:
+        context._query_started_at = time.perf_counter()
+
+
+@event.listens_for(Engine, "after_cursor_execute")
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    stats = _current_stats.get()
+    started = getattr(context, "_query_started_at", None)
+    if stats is None or started is None:
+        return
+    stats.record(statement, time.perf_counter() - started)
+
+
+class QueryInstrumentationMiddleware:
+    """ASGI middleware that reports per-request SQL counts as Server-Timing and a log line"""
+
+    def __init__(self, app, threshold: int = SQL_N_PLUS_ONE_THRESHOLD):
+        self.app = app
+        self.threshold = threshold
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not SQL_INSTRUMENTATION:
+            await self.app(scope, receive, send)
+            return
+
+        stats = RequestQueryStats(scope)
+        token = _current_stats.set(stats)
+        started = time.perf_counter()
+        status_code = None
+
+        async def send_with_timing(message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+                # Las cabeceras se envían antes del cuerpo: aquí ya se han ejecutado las consultas del handler
+                headers = list(message.get("headers", []))
+                headers.append((b"server-timing", stats.server_timing().encode("latin-1")))
+                message = {**message, "headers": headers}
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_timing)
+        finally:
+            _current_stats.reset(token)
+            self._log(stats, status_code, time.perf_counter() - started)
+
+    def _log(self, stats: RequestQueryStats, status_code, elapsed: float) -> None:
+        suspects = stats.repeated(self.threshold)
+        record = {
+            "method": stats.method,
+            "path": stats.path,
+            "route": stats.route,
+            "status": status_code,
+            "queries": stats.queries,
+            "db_ms": round(stats.db_time * 1000, 2),
+            "total_ms": round(elapsed * 1000, 2),
+            "repeated": [{"count": count, "sql": shape[:200]} for shape, count in stats.repeated()],
+        }
+        if suspects:
+            record["n_plus_one"] = True
+            logger.warning(json.dumps(record, ensure_ascii=False))
+        else:
+            logger.info(json.dumps(record, ensure_ascii=False))